@@ -0,0 +1,53 @@
+"""Store h3_index as BIGINT
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-15
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+FOREIGN_KEYS = [
+    ('user_hex_locations_h3_index_fkey', 'user_hex_locations'),
+    ('hex_landmarks_h3_index_fkey', 'hex_landmarks'),
+]
+
+
+def upgrade():
+    for name, table in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_='foreignkey')
+
+    # H3 cell indices have the high bit clear, so they fit in a signed BIGINT
+    for table in ('hex_cells', 'user_hex_locations', 'hex_landmarks'):
+        op.alter_column(
+            table, 'h3_index',
+            type_=sa.BigInteger,
+            postgresql_using="('x' || lpad(h3_index, 16, '0'))::bit(64)::bigint"
+        )
+
+    for name, table in FOREIGN_KEYS:
+        op.create_foreign_key(name, table, 'hex_cells', ['h3_index'], ['h3_index'])
+
+
+def downgrade():
+    for name, table in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_='foreignkey')
+
+    for table in ('hex_cells', 'user_hex_locations', 'hex_landmarks'):
+        op.alter_column(
+            table, 'h3_index',
+            type_=sa.String(20),
+            postgresql_using="to_hex(h3_index)"
+        )
+
+    for name, table in FOREIGN_KEYS:
+        op.create_foreign_key(name, table, 'hex_cells', ['h3_index'], ['h3_index'])
@@ -0,0 +1,43 @@
+"""Add composite indexes for hex activity queries
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-15
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Active users per hex: index-only scan over (h3_index, last_active) with user_id carried along
+    op.execute(
+        'CREATE INDEX idx_uhl_h3_last_active ON user_hex_locations '
+        '(h3_index, last_active DESC) INCLUDE (user_id)'
+    )
+    # "My hex" lookups by user
+    op.execute(
+        'CREATE INDEX idx_uhl_user_last_active ON user_hex_locations '
+        '(user_id, last_active DESC)'
+    )
+    # Inactive-user cleanup is a range scan on last_active
+    op.create_index('idx_uhl_last_active', 'user_hex_locations', ['last_active'])
+
+    # Superseded by the composites above
+    op.drop_index('idx_user_hex_locations_h3_index')
+    op.drop_index('idx_user_hex_locations_user_id')
+
+
+def downgrade():
+    op.create_index('idx_user_hex_locations_user_id', 'user_hex_locations', ['user_id'])
+    op.create_index('idx_user_hex_locations_h3_index', 'user_hex_locations', ['h3_index'])
+    op.drop_index('idx_uhl_last_active')
+    op.drop_index('idx_uhl_user_last_active')
+    op.drop_index('idx_uhl_h3_last_active')
@@ -18,4 +18,5 @@ alembic upgrade head || echo "Migrations failed or already applied"
 
 # Start the application
 echo "Starting address service..."
-exec uvicorn src.main:app --host 0.0.0.0 --port 8000
\ No newline at end of file
+exec uvicorn src.main:app --host 0.0.0.0 --port 8000 \
+    --workers "$(nproc)" --loop uvloop --http httptools --no-access-log
\ No newline at end of file
@@ -2,7 +2,7 @@
 CREATE EXTENSION IF NOT EXISTS postgis;
 
 CREATE TABLE IF NOT EXISTS hex_cells (
-    h3_index VARCHAR(20) PRIMARY KEY,
+    h3_index BIGINT PRIMARY KEY,
     resolution INTEGER NOT NULL,
     center_lat DOUBLE PRECISION NOT NULL,
     center_lng DOUBLE PRECISION NOT NULL,
@@ -16,7 +16,7 @@ CREATE TABLE IF NOT EXISTS hex_cells (
 CREATE TABLE IF NOT EXISTS user_hex_locations (
     id SERIAL PRIMARY KEY,
     user_id VARCHAR(255) NOT NULL,
-    h3_index VARCHAR(20) NOT NULL REFERENCES hex_cells(h3_index),
+    h3_index BIGINT NOT NULL REFERENCES hex_cells(h3_index),
     joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(user_id, h3_index)
@@ -24,7 +24,7 @@ CREATE TABLE IF NOT EXISTS user_hex_locations (
 
 CREATE TABLE IF NOT EXISTS hex_landmarks (
     id SERIAL PRIMARY KEY,
-    h3_index VARCHAR(20) NOT NULL REFERENCES hex_cells(h3_index),
+    h3_index BIGINT NOT NULL REFERENCES hex_cells(h3_index),
     name VARCHAR(255) NOT NULL,
     category VARCHAR(100),
     description TEXT,
@@ -35,7 +35,8 @@ CREATE TABLE IF NOT EXISTS hex_landmarks (
 
 -- Create indexes
 CREATE INDEX IF NOT EXISTS idx_hex_cells_resolution ON hex_cells(resolution);
-CREATE INDEX IF NOT EXISTS idx_user_hex_locations_user_id ON user_hex_locations(user_id);
-CREATE INDEX IF NOT EXISTS idx_user_hex_locations_h3_index ON user_hex_locations(h3_index);
+CREATE INDEX IF NOT EXISTS idx_uhl_h3_last_active ON user_hex_locations(h3_index, last_active DESC) INCLUDE (user_id);
+CREATE INDEX IF NOT EXISTS idx_uhl_user_last_active ON user_hex_locations(user_id, last_active DESC);
+CREATE INDEX IF NOT EXISTS idx_uhl_last_active ON user_hex_locations(last_active);
 CREATE INDEX IF NOT EXISTS idx_hex_landmarks_h3_index ON hex_landmarks(h3_index);
 EOF < /dev/null
\ No newline at end of file
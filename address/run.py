@@ -3,6 +3,7 @@
 Startup script for the address service
 """
 import asyncio
+import os
 import uvicorn
 from src.database import init_db
 from src.config import settings
@@ -37,13 +38,17 @@ def main():
     
     print("🎯 Starting FastAPI server...")
     
-    # Start the server
+    # Start the server; reload only works with a single worker
     uvicorn.run(
         "src.main:app",
         host="0.0.0.0", 
         port=settings.PORT,
         reload=settings.DEBUG,
-        log_level="info"
+        workers=1 if settings.DEBUG else os.cpu_count(),
+        loop="uvloop",
+        http="httptools",
+        log_level="info",
+        access_log=False
     )
 
 if __name__ == "__main__":
@@ -1,31 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import Optional
+import h3
+import orjson
 from ..database_sync import get_sync_db
+from ..redis_client import get_sync_redis
 from ..services.hex_service import HexagonalLocationService, DEFAULT_RESOLUTION
-from ..hex_models import HexCellResponse, JoinHexResponse, HexResolution, HexCell
+from ..hex_models import HexCellResponse, JoinHexResponse, HexResolution
 from ..auth import get_current_user
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1/hex", tags=["hexagonal"])
 
+# Static payloads are serialized once at import
+_RESOLUTIONS_JSON = orjson.dumps({
+    "resolutions": [
+        {
+            "level": 6,
+            "name": "City",
+            "approximate_area_km2": 100,
+            "description": "City-wide chat rooms"
+        },
+        {
+            "level": 7,
+            "name": "District",
+            "approximate_area_km2": 5,
+            "description": "District or borough level"
+        },
+        {
+            "level": 8,
+            "name": "Neighborhood",
+            "approximate_area_km2": 0.7,
+            "description": "Standard neighborhood chat (default)"
+        },
+        {
+            "level": 9,
+            "name": "Block",
+            "approximate_area_km2": 0.1,
+            "description": "City block or small area"
+        },
+        {
+            "level": 10,
+            "name": "Building",
+            "approximate_area_km2": 0.015,
+            "description": "Building or venue level"
+        }
+    ],
+    "default": DEFAULT_RESOLUTION
+})
+_TEST_JSON = orjson.dumps(
+    {"status": "hex system operational", "message": "The hexagonal location system is ready"}
+)
+
+def get_hex_service(db: Session = Depends(get_sync_db)) -> HexagonalLocationService:
+    """Hex service bound to the request's database session and shared Redis presence"""
+    return HexagonalLocationService(db, get_sync_redis())
+
+# Handlers that touch the synchronous Session are plain `def` so FastAPI runs
+# them in its threadpool instead of blocking the event loop.
 @router.post("/join", response_model=JoinHexResponse)
-async def join_neighborhood_chat(
+def join_neighborhood_chat(
     lat: float = Query(..., description="Latitude"),
     lng: float = Query(..., description="Longitude"),
-    resolution: Optional[int] = Query(DEFAULT_RESOLUTION, description="H3 resolution (6-10)"),
+    resolution: int = Query(DEFAULT_RESOLUTION, ge=6, le=10, description="H3 resolution (6-10)"),
     # current_user = Depends(get_current_user),  # Temporarily disabled for testing
-    db: Session = Depends(get_sync_db)
+    service: HexagonalLocationService = Depends(get_hex_service)
 ):
     """
     Join the neighborhood hex chat for the given location.
     Returns hex cell info and active neighbors.
     """
-    if resolution < 6 or resolution > 10:
-        raise HTTPException(400, "Resolution must be between 6 and 10")
-    
-    service = HexagonalLocationService(db)
     # Using test user ID for now
     test_user_id = "test-user-123"
     result = service.join_hex_chat(test_user_id, lat, lng, resolution)
@@ -33,35 +77,37 @@ async def join_neighborhood_chat(
     return result
 
 @router.get("/cell/{h3_index}", response_model=HexCellResponse)
-async def get_hex_cell_info(
+def get_hex_cell_info(
     h3_index: str,
-    db: Session = Depends(get_sync_db)
+    service: HexagonalLocationService = Depends(get_hex_service)
 ):
     """Get information about a specific hex cell"""
-    service = HexagonalLocationService(db)
-    hex_cell = db.query(HexCell).filter_by(h3_index=h3_index).first()
+    if not h3.is_valid_cell(h3_index):
+        raise HTTPException(404, "Hex cell not found")
+    
+    hex_cell = service.get_hex_cell(h3_index)
     
     if not hex_cell:
         raise HTTPException(404, "Hex cell not found")
     
+    h3_index = h3.int_to_str(hex_cell.h3_index)
     return HexCellResponse(
-        h3_index=hex_cell.h3_index,
+        h3_index=h3_index,
         resolution=hex_cell.resolution,
         center={"lat": hex_cell.center_lat, "lng": hex_cell.center_lng},
         display_name=hex_cell.display_name,
         locality=hex_cell.locality,
-        active_users=hex_cell.active_users,
-        boundary=service.get_hex_boundary(hex_cell.h3_index)
+        active_users=service.get_active_users(hex_cell),
+        boundary=service.get_hex_boundary(h3_index)
     )
 
 @router.get("/neighbors/{h3_index}")
-async def get_active_neighbors(
+def get_active_neighbors(
     h3_index: str,
-    rings: int = Query(1, description="Number of hex rings to search"),
-    db: Session = Depends(get_sync_db)
+    rings: int = Query(1, ge=0, le=4, description="Number of hex rings to search"),
+    service: HexagonalLocationService = Depends(get_hex_service)
 ):
     """Get active neighboring hex cells"""
-    service = HexagonalLocationService(db)
     neighbors = service.get_active_neighbors(h3_index, rings)
     
     return {"neighbors": neighbors}
@@ -69,50 +115,15 @@ async def get_active_neighbors(
 @router.get("/resolutions")
 async def get_available_resolutions():
     """Get available hex resolutions and their approximate sizes"""
-    return {
-        "resolutions": [
-            {
-                "level": 6,
-                "name": "City",
-                "approximate_area_km2": 100,
-                "description": "City-wide chat rooms"
-            },
-            {
-                "level": 7,
-                "name": "District",
-                "approximate_area_km2": 5,
-                "description": "District or borough level"
-            },
-            {
-                "level": 8,
-                "name": "Neighborhood",
-                "approximate_area_km2": 0.7,
-                "description": "Standard neighborhood chat (default)"
-            },
-            {
-                "level": 9,
-                "name": "Block",
-                "approximate_area_km2": 0.1,
-                "description": "City block or small area"
-            },
-            {
-                "level": 10,
-                "name": "Building",
-                "approximate_area_km2": 0.015,
-                "description": "Building or venue level"
-            }
-        ],
-        "default": DEFAULT_RESOLUTION
-    }
+    return Response(_RESOLUTIONS_JSON, media_type="application/json")
 
 @router.post("/cleanup")
-async def cleanup_inactive_users(
-    timeout_minutes: int = Query(30, description="Minutes before user is considered inactive"),
-    db: Session = Depends(get_sync_db),
+def cleanup_inactive_users(
+    timeout_minutes: int = Query(30, ge=1, description="Minutes before user is considered inactive"),
+    service: HexagonalLocationService = Depends(get_hex_service),
     _: str = Depends(get_current_user)  # Admin only
 ):
     """Clean up inactive users from hex cells"""
-    service = HexagonalLocationService(db)
     service.cleanup_inactive_users(timeout_minutes)
     
     return {"status": "cleanup completed"}
@@ -120,4 +131,4 @@ async def cleanup_inactive_users(
 @router.get("/test")
 async def test_hex_system():
     """Test endpoint to verify hex system is working"""
-    return {"status": "hex system operational", "message": "The hexagonal location system is ready"}
\ No newline at end of file
+    return Response(_TEST_JSON, media_type="application/json")
\ No newline at end of file
@@ -1,7 +1,10 @@
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
-from typing import Optional, Dict, Any
+import jwt
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+import hashlib
+import time
 import structlog
 
 from .config import settings
@@ -10,22 +13,62 @@ logger = structlog.get_logger()
 
 security = HTTPBearer()
 
+# Bound once so the request path skips settings lookups, key encoding and
+# per-call allocations
+_SECRET = settings.SECRET_KEY.encode()
+_ALGS = ("HS256",)
+_decode = jwt.decode
+
+# Decoded tokens keyed by token digest. get_current_user never awaits between
+# lookup and insert, so the event loop is the only writer and no lock is needed.
+TOKEN_CACHE_MAXSIZE = 10_000
+TOKEN_CACHE_TTL = 60
+_token_cache: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+
+def _cached_payload(key: bytes) -> Optional[Dict[str, Any]]:
+    """Return a copy of a cached payload if it is still valid"""
+    entry = _token_cache.get(key)
+    if entry is None:
+        return None
+    payload, expires_at = entry
+    if expires_at <= time.time():
+        del _token_cache[key]
+        return None
+    _token_cache.move_to_end(key)
+    # Callers get their own dict so one request can't alter another's user
+    return dict(payload)
+
+
+def _cache_payload(key: bytes, payload: Dict[str, Any]) -> None:
+    """Cache a payload until its exp claim or the cache TTL, whichever is first"""
+    expires_at = time.time() + TOKEN_CACHE_TTL
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        expires_at = min(expires_at, exp)
+    _token_cache[key] = (dict(payload), expires_at)
+    _token_cache.move_to_end(key)
+    if len(_token_cache) > TOKEN_CACHE_MAXSIZE:
+        _token_cache.popitem(last=False)
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """Verify and decode a JWT, raising jwt.PyJWTError if it is invalid"""
+    return _decode(token, _SECRET, algorithms=_ALGS)
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> Dict[str, Any]:
     """Get current user from JWT token"""
+    cache_key = hashlib.blake2b(credentials.credentials.encode(), digest_size=16).digest()
+    cached = _cached_payload(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        logger.info(f"Attempting to decode JWT token", auth_header=credentials.scheme, token_preview=credentials.credentials[:20])
-        logger.info(f"Using SECRET_KEY: {settings.SECRET_KEY[:10]}...")
-        
         # Decode JWT token
-        payload = jwt.decode(
-            credentials.credentials,
-            settings.SECRET_KEY,
-            algorithms=["HS256"]
-        )
-        
-        logger.info(f"JWT payload decoded successfully", user_id=payload.get("user_id"), username=payload.get("username"))
+        payload = decode_token(credentials.credentials)
         
         user_id = payload.get("user_id") or payload.get("sub")
         if user_id is None:
@@ -35,10 +78,12 @@ async def get_current_user(
                 detail="Invalid authentication credentials"
             )
         
-        return {"user_id": user_id, **payload}
+        user = {"user_id": user_id, **payload}
+        _cache_payload(cache_key, user)
+        return user
     
-    except JWTError as e:
-        logger.error(f"JWT decode error", error=str(e), error_type=type(e).__name__)
+    except jwt.PyJWTError as e:
+        logger.debug("JWT decode error", error_type=type(e).__name__)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials"
@@ -1,12 +1,18 @@
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, String, DateTime, JSON, text
+from sqlalchemy import Column, Index, String, BigInteger, DateTime, JSON, text, func
+from sqlalchemy.orm import column_property
 from sqlalchemy.dialects.postgresql import UUID
 from geoalchemy2 import Geometry
+from h3.api import basic_int as h3_int
 import uuid
 from datetime import datetime
 
 from .config import settings
+from .services.spatial_service import LOCATION_H3_RESOLUTION
+
+# Rows tagged per round trip when backfilling h3_index
+H3_BACKFILL_BATCH_SIZE = 5000
 
 # Database setup
 engine = create_async_engine(settings.DATABASE_URL, echo=settings.DEBUG)
@@ -24,8 +30,14 @@ class Location(Base):
     address_string = Column(String, nullable=False)
     normalized_address = Column(String, nullable=False, index=True)
     
-    # PostGIS geometry column
-    coordinates = Column(Geometry('POINT', srid=4326), nullable=False, index=True)
+    # PostGIS geometry column; its planar index is created by init_db (SP-GiST on
+    # PostGIS 3+, GiST otherwise), KNN (<->) runs on the geography index below
+    coordinates = Column(Geometry('POINT', srid=4326, spatial_index=False), nullable=False)
+    # Point components read by PostGIS so rows never need geometry parsing in Python
+    latitude = column_property(func.ST_Y(coordinates))
+    longitude = column_property(func.ST_X(coordinates))
+    # H3 cell of the point as uint64, used to prefilter polygon searches
+    h3_index = Column(BigInteger, index=True)
     
     # Address components
     street_number = Column(String)
@@ -41,6 +53,15 @@ class Location(Base):
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Lets ST_DWithin on coordinates::geography use an index scan
+        Index(
+            'ix_locations_coordinates_geog',
+            text('(coordinates::geography)'),
+            postgresql_using='gist'
+        ),
+    )
 
 async def get_db():
     """Database dependency"""
@@ -50,6 +71,26 @@ async def get_db():
         finally:
             await session.close()
 
+async def _backfill_h3_index(conn):
+    """Tag rows stored before the h3_index column existed with their H3 cell"""
+    while True:
+        rows = (await conn.execute(
+            text(
+                "SELECT id, ST_Y(coordinates) AS lat, ST_X(coordinates) AS lng "
+                "FROM locations WHERE h3_index IS NULL LIMIT :limit"
+            ),
+            {"limit": H3_BACKFILL_BATCH_SIZE}
+        )).all()
+        if not rows:
+            return
+        await conn.execute(
+            text("UPDATE locations SET h3_index = :h3_index WHERE id = :id"),
+            [
+                {"id": row.id, "h3_index": h3_int.latlng_to_cell(row.lat, row.lng, LOCATION_H3_RESOLUTION)}
+                for row in rows
+            ]
+        )
+
 async def init_db():
     """Initialize database"""
     async with engine.begin() as conn:
@@ -57,6 +98,31 @@ async def init_db():
         await conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
         # Create tables
         await conn.run_sync(Base.metadata.create_all)
+        # Columns added after the table was first created
+        await conn.execute(text("ALTER TABLE locations ADD COLUMN IF NOT EXISTS h3_index BIGINT"))
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_locations_h3_index ON locations (h3_index)"
+        ))
+        await _backfill_h3_index(conn)
+        await conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_locations_coordinates_geog "
+            "ON locations USING gist ((coordinates::geography))"
+        ))
+        # SP-GiST partitions points without overlapping boxes, so point-in-polygon
+        # and bbox lookups touch fewer pages and the index is smaller than GiST
+        postgis_version = await conn.scalar(text("SELECT postgis_lib_version()"))
+        if int(postgis_version.split('.')[0]) >= 3:
+            await conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_locations_coordinates_spgist "
+                "ON locations USING spgist (coordinates)"
+            ))
+            # GiST index GeoAlchemy2 created on the column in earlier schemas
+            await conn.execute(text("DROP INDEX IF EXISTS idx_locations_coordinates"))
+        else:
+            await conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_locations_coordinates "
+                "ON locations USING gist (coordinates)"
+            ))
 
 async def close_db():
     """Close database connections"""
@@ -3,8 +3,20 @@ from sqlalchemy.orm import sessionmaker, Session
 from .config import settings
 
 # Synchronous database setup for hex operations
-sync_engine = create_engine(settings.DATABASE_URL.replace("postgresql+asyncpg", "postgresql"), echo=settings.DEBUG)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+# Keep warm pooled connections so hex requests don't pay connect/auth each time
+sync_engine = create_engine(
+    settings.DATABASE_URL.replace("postgresql+asyncpg", "postgresql"),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    echo=False
+)
+# Objects keep their loaded state after commit; the hex join path would otherwise
+# re-SELECT the hex cell it just wrote when building the response
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=sync_engine
+)
 
 def get_sync_db():
     """Get synchronous database session"""
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, Request, HTTPException
 from typing import Optional
 import structlog
+import jwt
+
+from .auth import decode_token
 
 router = APIRouter()
 logger = structlog.get_logger()
@@ -11,9 +14,7 @@ async def debug_auth(request: Request):
     headers = dict(request.headers)
     auth_header = headers.get("authorization", "")
     
-    logger.info("Debug auth endpoint called", 
-                has_auth_header=bool(auth_header),
-                auth_header_preview=auth_header[:50] if auth_header else "NONE")
+    logger.debug("Debug auth endpoint called", has_auth_header=bool(auth_header))
     
     if not auth_header:
         raise HTTPException(status_code=401, detail="No authorization header")
@@ -23,22 +24,16 @@ async def debug_auth(request: Request):
     
     token = auth_header[7:]  # Remove "Bearer "
     
-    # Try to decode
-    from jose import jwt
-    from .config import settings
-    
+    # Try to decode with the same verification as get_current_user
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        payload = decode_token(token)
         return {
             "success": True,
             "user_id": payload.get("user_id"),
-            "username": payload.get("username"),
-            "secret_key_used": settings.SECRET_KEY[:10] + "..."
+            "username": payload.get("username")
         }
-    except Exception as e:
+    except jwt.PyJWTError as e:
         return {
             "success": False,
-            "error": str(e),
-            "token_preview": token[:20] + "...",
-            "secret_key_used": settings.SECRET_KEY[:10] + "..."
+            "error": str(e)
         }
\ No newline at end of file
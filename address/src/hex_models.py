@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from sqlalchemy import Column, String, Float, Integer, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, Float, Integer, BigInteger, DateTime, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -11,7 +11,7 @@ Base = declarative_base()
 class HexCell(Base):
     __tablename__ = "hex_cells"
     
-    h3_index = Column(String, primary_key=True)
+    h3_index = Column(BigInteger, primary_key=True)  # H3 cell as uint64
     resolution = Column(Integer, nullable=False)
     center_lat = Column(Float, nullable=False)
     center_lng = Column(Float, nullable=False)
@@ -29,18 +29,23 @@ class UserHexLocation(Base):
     
     id = Column(Integer, primary_key=True)
     user_id = Column(String, nullable=False)
-    h3_index = Column(String, ForeignKey("hex_cells.h3_index"), nullable=False)
+    h3_index = Column(BigInteger, ForeignKey("hex_cells.h3_index"), nullable=False)
     joined_at = Column(DateTime, default=datetime.utcnow)
     last_active = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     hex_cell = relationship("HexCell", back_populates="user_locations")
+    
+    __table_args__ = (
+        # One membership row per user and hex; join_hex_chat upserts against it
+        UniqueConstraint("user_id", "h3_index"),
+    )
 
 class HexLandmark(Base):
     __tablename__ = "hex_landmarks"
     
     id = Column(Integer, primary_key=True)
-    h3_index = Column(String, ForeignKey("hex_cells.h3_index"), nullable=False)
+    h3_index = Column(BigInteger, ForeignKey("hex_cells.h3_index"), nullable=False)
     name = Column(String, nullable=False)
     category = Column(String)
     description = Column(Text)
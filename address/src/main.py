@@ -1,17 +1,23 @@
 from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import os
 import uvicorn
 import structlog
 from prometheus_client import make_asgi_app
 
 from .database import init_db, close_db
+from .redis_client import close_redis
+from .services.address_service import get_address_service
 from .routers import addresses, health, spatial_analysis
 from .api import hex_routes
 from . import test_endpoint, debug_auth
-from .middleware import LoggingMiddleware, RateLimitMiddleware
+from .middleware import ClientIPMiddleware, LoggingMiddleware, RateLimitMiddleware
 from .config import settings
+from .responses import ORJSONResponse
+from .logging_config import configure_logging, shutdown_logging
 
+configure_logging()
 logger = structlog.get_logger()
 
 @asynccontextmanager
@@ -21,25 +27,31 @@ async def lifespan(app: FastAPI):
     await init_db()
     yield
     # Shutdown
+    await get_address_service().geocoder.aclose()
     await close_db()
+    await close_redis()
     logger.info("Shutting down address service")
+    shutdown_logging()
 
 app = FastAPI(
     title="Address Service with Spatial Analysis",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.ALLOWED_ORIGINS,
+    allow_origins=list(settings.ALLOWED_ORIGINS),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 app.add_middleware(LoggingMiddleware)
 app.add_middleware(RateLimitMiddleware)
+# Added last so it wraps the middlewares above
+app.add_middleware(ClientIPMiddleware)
 
 # Routes
 app.include_router(addresses.router, prefix="/api/v1/addresses", tags=["addresses"])
@@ -58,5 +70,9 @@ if __name__ == "__main__":
         "src.main:app",
         host="0.0.0.0",
         port=settings.PORT,
-        reload=settings.DEBUG
+        reload=settings.DEBUG,
+        workers=1 if settings.DEBUG else os.cpu_count(),
+        loop="uvloop",
+        http="httptools",
+        access_log=False
     )
\ No newline at end of file
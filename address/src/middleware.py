@@ -1,42 +1,106 @@
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
+import ipaddress
+import logging
 import structlog
 import time
-from typing import Dict, Any
-import redis.asyncio as redis
+from typing import Dict, Any, Iterable
+from redis.exceptions import ResponseError
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from .config import settings
+from .redis_client import get_redis
 
 logger = structlog.get_logger()
 
+# INCR the window counter, start the window on the first hit and report -1 once
+# the limit is exceeded, all in one atomic round-trip
+RATE_LIMIT_SCRIPT = """
+local n = redis.call('INCR', KEYS[1])
+if n == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+if n > tonumber(ARGV[2]) then
+    return -1
+end
+return n
+"""
+
+class ClientIPMiddleware:
+    """Resolve the client IP once per request and store it on request.state.client_ip
+
+    The socket peer is used unless it is one of settings.TRUSTED_PROXIES; then
+    X-Forwarded-For is walked from the right and the first untrusted hop wins,
+    so clients cannot pick their own address (and rate limit key) by sending
+    the header themselves. Must be added last so it runs before the logging
+    and rate limit middlewares.
+    """
+    
+    def __init__(self, app: ASGIApp, trusted_proxies: Iterable[str] = None):
+        self.app = app
+        if trusted_proxies is None:
+            trusted_proxies = settings.TRUSTED_PROXIES
+        self.trusted_networks = tuple(
+            ipaddress.ip_network(proxy, strict=False) for proxy in trusted_proxies
+        )
+    
+    def _is_trusted(self, host: str) -> bool:
+        if not self.trusted_networks:
+            return False
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_networks)
+    
+    def _resolve(self, scope: Scope) -> str:
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        if not self._is_trusted(client_ip):
+            return client_ip
+        
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                hops = [hop.strip() for hop in value.decode("latin-1").split(",")]
+                for hop in reversed(hops):
+                    if hop and not self._is_trusted(hop):
+                        return hop
+                break
+        return client_ip
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            scope.setdefault("state", {})["client_ip"] = self._resolve(scope)
+        
+        await self.app(scope, receive, send)
+
 class LoggingMiddleware(BaseHTTPMiddleware):
     """Log all requests and responses"""
     
     async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
+        started_at = time.time()
+        start_time = time.monotonic()
+        method = request.method
+        url = str(request.url)
+        client_ip = request.state.client_ip
         
-        # Log request
-        logger.info(
-            "Request started",
-            method=request.method,
-            url=str(request.url),
-            client_ip=request.client.host
-        )
+        # The completion record carries everything needed in production
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Request started", method=method, url=url, client_ip=client_ip)
         
         # Process request
         response = await call_next(request)
         
-        # Calculate duration
-        duration = time.time() - start_time
-        
-        # Log response
+        # One record per request; rendered on the log listener thread
         logger.info(
-            "Request completed",
-            method=request.method,
-            url=str(request.url),
+            "Request",
+            method=method,
+            url=url,
+            client_ip=client_ip,
             status_code=response.status_code,
-            duration_seconds=round(duration, 3)
+            started_at=started_at,
+            duration_seconds=time.monotonic() - start_time
         )
         
         return response
@@ -47,38 +111,45 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     def __init__(self, app, requests_per_minute: int = 60):
         super().__init__(app)
         self.requests_per_minute = requests_per_minute
-        self.redis = redis.from_url(settings.REDIS_URL)
+        self.redis = get_redis()
+        # Runs via EVALSHA, reloading the script on NOSCRIPT
+        self.rate_limit = self.redis.register_script(RATE_LIMIT_SCRIPT)
+        # Cleared if the server refuses scripting (e.g. EVAL disabled by ACL)
+        self.use_script = True
     
-    async def dispatch(self, request: Request, call_next):
-        # Get client IP
-        client_ip = request.client.host
+    async def _hit(self, key: str) -> int:
+        """Count a request against key, returning -1 once over the limit"""
+        if self.use_script:
+            try:
+                return await self.rate_limit(keys=[key], args=[60, self.requests_per_minute])
+            except ResponseError as e:
+                logger.warning("Rate limit script unavailable, using pipeline", error=str(e))
+                self.use_script = False
         
-        # Rate limit key
-        key = f"rate_limit:{client_ip}"
+        # Create the window with its TTL, then INCR, in one round-trip (not atomic).
+        # SET ... NX EX works on servers too old for EXPIRE ... NX (Redis < 7)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(key, 0, ex=60, nx=True)
+            pipe.incr(key)
+            _, count = await pipe.execute()
+        return -1 if count > self.requests_per_minute else count
+    
+    async def dispatch(self, request: Request, call_next):
+        # Rate limit key; client IP is resolved by ClientIPMiddleware
+        key = f"rate_limit:{request.state.client_ip}"
         
         try:
-            # Get current count
-            current = await self.redis.get(key)
-            
-            if current is None:
-                # First request in window
-                await self.redis.setex(key, 60, 1)
-            else:
-                count = int(current)
-                if count >= self.requests_per_minute:
-                    return JSONResponse(
-                        status_code=429,
-                        content={"detail": "Rate limit exceeded"}
-                    )
-                
-                # Increment counter
-                await self.redis.incr(key)
-            
-            # Process request
-            response = await call_next(request)
-            return response
-            
+            count = await self._hit(key)
         except Exception as e:
             logger.warning("Rate limit check failed, allowing request", error=str(e))
             # Allow request if Redis fails
-            return await call_next(request)
\ No newline at end of file
+            count = 0
+        
+        if count == -1:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded"}
+            )
+        
+        # Process request
+        return await call_next(request)
\ No newline at end of file
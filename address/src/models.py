@@ -1,8 +1,8 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 from uuid import UUID
-from shapely.geometry import Point, Polygon, MultiPolygon
+from shapely.geometry import Point, Polygon, MultiPolygon, box
 import geopandas as gpd
 
 class Coordinates(BaseModel):
@@ -34,13 +34,7 @@ class BoundingBox(BaseModel):
     
     def to_shapely_polygon(self) -> Polygon:
         """Convert to Shapely Polygon"""
-        return Polygon([
-            (self.min_lon, self.min_lat),
-            (self.max_lon, self.min_lat),
-            (self.max_lon, self.max_lat),
-            (self.min_lon, self.max_lat),
-            (self.min_lon, self.min_lat)
-        ])
+        return box(self.min_lon, self.min_lat, self.max_lon, self.max_lat)
 
 class AddressSearchRequest(BaseModel):
     query: str = Field(..., min_length=3, max_length=500)
@@ -52,11 +46,11 @@ class AddressDetailRequest(BaseModel):
     address: Optional[str] = None
     coordinates: Optional[Coordinates] = None
     
-    @validator('*', pre=True)
-    def check_at_least_one(cls, v, values):
-        if not any(values.values()) and v is None:
+    @model_validator(mode='after')
+    def check_at_least_one(self):
+        if not (self.place_id or self.address or self.coordinates):
             raise ValueError('At least one field must be provided')
-        return v
+        return self
 
 class LocationResponse(BaseModel):
     id: UUID
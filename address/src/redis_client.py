@@ -0,0 +1,27 @@
+import redis as sync_redis
+import redis.asyncio as redis
+
+from .config import settings
+
+# Shared connection pool so middleware and handlers reuse open connections
+redis_pool = redis.ConnectionPool.from_url(
+    settings.REDIS_URL, max_connections=64, decode_responses=False
+)
+
+# Separate pool for the synchronous hex service, which runs in the threadpool
+sync_redis_pool = sync_redis.ConnectionPool.from_url(
+    settings.REDIS_URL, max_connections=64, decode_responses=False
+)
+
+def get_redis() -> redis.Redis:
+    """Redis client backed by the shared pool"""
+    return redis.Redis(connection_pool=redis_pool)
+
+def get_sync_redis() -> sync_redis.Redis:
+    """Blocking Redis client backed by the shared sync pool"""
+    return sync_redis.Redis(connection_pool=sync_redis_pool)
+
+async def close_redis():
+    """Close pooled Redis connections"""
+    await redis_pool.disconnect()
+    sync_redis_pool.disconnect()
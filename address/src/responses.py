@@ -0,0 +1,16 @@
+from typing import Any
+
+import orjson
+from starlette.responses import JSONResponse
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson.
+
+    Kept local rather than using fastapi.responses.ORJSONResponse, which newer
+    FastAPI releases deprecate and warn about on every response.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
@@ -1,10 +1,9 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-import redis.asyncio as redis
 
 from ..database import get_db
-from ..config import settings
+from ..redis_client import get_redis
 
 router = APIRouter()
 
@@ -21,9 +20,7 @@ async def readiness_check(db: AsyncSession = Depends(get_db)):
         await db.execute(text("SELECT 1"))
         
         # Check Redis
-        redis_client = redis.from_url(settings.REDIS_URL)
-        await redis_client.ping()
-        await redis_client.close()
+        await get_redis().ping()
         
         return {"status": "ready", "database": "ok", "redis": "ok"}
     except Exception as e:
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
+import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from ..database import get_db
 from ..models import (
@@ -10,13 +11,12 @@ from ..models import (
     HeatmapData,
     Coordinates
 )
-from ..services.address_service import AddressService
-from ..services.spatial_service import SpatialAnalysisService
+from ..services.address_service import get_address_service
 from ..auth import get_current_user
 
 router = APIRouter()
-address_service = AddressService()
-spatial_service = SpatialAnalysisService()
+address_service = get_address_service()
+spatial_service = address_service.spatial
 
 @router.post("/analyze", response_model=SpatialAnalysisResponse)
 async def analyze_spatial_distribution(
@@ -32,22 +32,30 @@ async def analyze_spatial_distribution(
         import uuid
         
         location_uuids = [uuid.UUID(lid) for lid in location_ids]
-        result = await db.execute(
-            select(Location).where(Location.id.in_(location_uuids))
-        )
-        locations_db = result.scalars().all()
-        
-        # Convert to response models
-        locations = [address_service._to_response(loc) for loc in locations_db]
         
-        # Find clusters
-        clusters = spatial_service.find_clusters(locations)
-        
-        # Calculate statistics
-        stats = spatial_service.calculate_spatial_statistics(locations)
+        # Stream rows and convert to response models chunk by chunk
+        locations = [
+            loc async for loc in address_service.stream_locations(
+                select(Location).where(Location.id.in_(location_uuids)), db
+            )
+        ]
         
-        # Create H3 heatmap
-        density_map = spatial_service.create_h3_heatmap(locations)
+        # Clusters, statistics and the H3 heatmap are independent CPU-bound
+        # passes; run them in worker threads to keep the event loop free.
+        # Large sets are clustered in PostGIS and only the geometry is built here
+        async with asyncio.TaskGroup() as tg:
+            clusters_task = tg.create_task(
+                address_service.find_clusters(locations, db)
+            )
+            stats_task = tg.create_task(
+                asyncio.to_thread(spatial_service.calculate_spatial_statistics, locations)
+            )
+            density_task = tg.create_task(
+                asyncio.to_thread(spatial_service.create_h3_heatmap, locations)
+            )
+        clusters = clusters_task.result()
+        stats = stats_task.result()
+        density_map = density_task.result()
         
         return SpatialAnalysisResponse(
             total_locations=stats['total_locations'],
@@ -59,27 +67,22 @@ async def analyze_spatial_distribution(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/search/polygon", response_model=List[LocationResponse])
+@router.post("/search/polygon", response_model=None)
 async def search_in_polygon(
     request: PolygonSearchRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
-):
+    current_user: dict = Depends(get_current_user),
+    cache_control: Optional[str] = Header(None)
+) -> List[LocationResponse]:
     """Find all locations within a polygon"""
     try:
-        # Get all locations (in production, add spatial index query)
-        from sqlalchemy import select
-        from ..database import Location
-        
-        result = await db.execute(select(Location))
-        locations_db = result.scalars().all()
-        locations = [address_service._to_response(loc) for loc in locations_db]
-        
-        # Filter by polygon
-        polygon = request.to_shapely_polygon()
-        filtered = spatial_service.find_locations_in_polygon(locations, polygon)
-        
-        return filtered[:request.limit]
+        # Filter in PostGIS so only matching rows leave the database
+        return await address_service.find_locations_in_polygon(
+            request.to_shapely_polygon(),
+            request.limit,
+            db,
+            use_cache=cache_control != "no-cache"
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -146,20 +149,15 @@ async def find_nearest_locations(
     target: Coordinates,
     k: int = 5,
     db: AsyncSession = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    cache_control: Optional[str] = Header(None)
 ):
     """Find k nearest locations to a coordinate"""
     try:
-        # Get all locations (in production, use spatial index)
-        from sqlalchemy import select
-        from ..database import Location
-        
-        result = await db.execute(select(Location))
-        locations_db = result.scalars().all()
-        locations = [address_service._to_response(loc) for loc in locations_db]
-        
-        # Find nearest neighbors
-        nearest = spatial_service.find_nearest_neighbors(target, locations, k)
+        # Index-backed KNN search in PostGIS
+        nearest = await address_service.find_nearest_locations(
+            target, k, db, use_cache=cache_control != "no-cache"
+        )
         
         return [
             {
@@ -1,15 +1,20 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy import select, func, text
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator
+import asyncio
+from sqlalchemy import select, func, text, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
-from geoalchemy2 import WKTElement
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from geoalchemy2.functions import ST_Distance, ST_DWithin, ST_GeogFromText
-from shapely.geometry import Point
-from shapely.wkt import loads
+from shapely.geometry import Polygon
 import geopandas as gpd
-import redis.asyncio as redis
-import json
+import h3
+from h3.api import basic_int as h3_int
+import orjson
 import hashlib
+import re
+import zlib
 from datetime import datetime
+from functools import lru_cache
 
 from ..database import Location
 from ..models import (
@@ -17,20 +22,55 @@ from ..models import (
     Coordinates, 
     AddressComponents,
     ChatRoomAtLocationResponse,
-    BoundingBox
+    BoundingBox,
+    SpatialCluster
 )
 from .geocoding import get_geocoding_provider
-from .spatial_service import SpatialAnalysisService
+from .spatial_service import (
+    SpatialAnalysisService,
+    DEFAULT_H3_RESOLUTION,
+    LOCATION_H3_RESOLUTION,
+    polygon_h3_cover
+)
 from ..config import settings
+from ..redis_client import get_redis
 import structlog
 
 logger = structlog.get_logger()
 
+# Fast zlib level; cached location lists are repetitive JSON and shrink well
+CACHE_COMPRESSION_LEVEL = 1
+
+# From this many locations DBSCAN runs in PostGIS (ST_ClusterDBSCAN) on the
+# spatial index instead of in-process scikit-learn
+DATABASE_CLUSTERING_MIN_LOCATIONS = 500
+
+# Common abbreviations applied by _normalize_address
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st',
+    'avenue': 'ave',
+    'road': 'rd',
+    'boulevard': 'blvd',
+    'drive': 'dr',
+    'lane': 'ln',
+    'court': 'ct',
+    'north': 'n',
+    'south': 's',
+    'east': 'e',
+    'west': 'w',
+}
+# Street types after a space; directions only as a standalone word between spaces
+_ADDRESS_ABBREVIATION_RE = re.compile(
+    r'(?<= )(?:street|avenue|road|boulevard|drive|lane|court)\b'
+    r'|(?<= )(?:north|south|east|west)(?= )'
+)
+
 class AddressService:
     def __init__(self):
         self.geocoder = get_geocoding_provider()
         try:
-            self.redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+            # Raw bytes client on the shared pool; cached values are orjson payloads
+            self.redis = get_redis()
         except Exception as e:
             logger.warning("Redis connection failed, caching disabled", error=str(e))
             self.redis = None
@@ -38,7 +78,28 @@ class AddressService:
     
     def _cache_key(self, prefix: str, identifier: str) -> str:
         """Generate cache key"""
-        return f"address:{prefix}:{hashlib.md5(identifier.encode()).hexdigest()}"
+        return f"address:{prefix}:{hashlib.blake2b(identifier.encode(), digest_size=8).hexdigest()}"
+    
+    async def _cache_get(self, cache_key: str) -> Optional[Any]:
+        """Read a compressed JSON value from Redis, or None on miss or failure"""
+        if not self.redis:
+            return None
+        try:
+            cached = await self.redis.get(cache_key)
+            return orjson.loads(zlib.decompress(cached)) if cached else None
+        except Exception as e:
+            logger.warning("Cache read failed", error=str(e))
+            return None
+    
+    async def _cache_set(self, cache_key: str, value: Any, ttl: int):
+        """Write a compressed JSON value to Redis, ignoring failures"""
+        if not self.redis:
+            return
+        try:
+            payload = orjson.dumps(value, option=orjson.OPT_NAIVE_UTC)
+            await self.redis.setex(cache_key, ttl, zlib.compress(payload, CACHE_COMPRESSION_LEVEL))
+        except Exception as e:
+            logger.warning("Cache write failed", error=str(e))
     
     async def search_addresses(
         self, 
@@ -51,57 +112,31 @@ class AddressService:
         
         # Check cache first
         cache_key = self._cache_key("search", f"{query}:{limit}:{within_bbox}")
-        if self.redis:
-            try:
-                cached = await self.redis.get(cache_key)
-                if cached:
-                    return [LocationResponse(**item) for item in json.loads(cached)]
-            except Exception as e:
-                logger.warning("Cache read failed", error=str(e))
+        cached = await self._cache_get(cache_key)
+        if cached:
+            return [LocationResponse(**item) for item in cached]
         
         # Search using geocoding provider
         results = await self.geocoder.search_places(query, limit)
         
         # Filter by bounding box if provided
         if within_bbox:
-            bbox_polygon = within_bbox.to_shapely_polygon()
+            # Axis-aligned box: plain comparisons; strict like Polygon.contains (boundary excluded)
             results = [
                 r for r in results
-                if bbox_polygon.contains(
-                    Point(r['coordinates']['longitude'], r['coordinates']['latitude'])
-                )
+                if within_bbox.min_lon < r['coordinates']['longitude'] < within_bbox.max_lon
+                and within_bbox.min_lat < r['coordinates']['latitude'] < within_bbox.max_lat
             ]
         
-        locations = []
-        for result in results:
-            # Check if location already exists in DB
-            existing = await db.execute(
-                select(Location).where(Location.place_id == result['place_id'])
-            )
-            location = existing.scalar_one_or_none()
-            
-            if not location:
-                # Create new location
-                location = await self._create_location_from_geocode(result, db)
-            
-            # Add H3 index
-            response = self._to_response(location)
-            response.h3_index = self.spatial.calculate_h3_indices(
-                response.coordinates.latitude,
-                response.coordinates.longitude
-            )
-            locations.append(response)
+        by_place_id = await self._get_or_create_locations(results, db)
+        locations = [self._to_response(by_place_id[r['place_id']]) for r in results]
         
         # Cache results
-        if self.redis:
-            try:
-                await self.redis.setex(
-                    cache_key,
-                    settings.REDIS_CACHE_TTL,
-                    json.dumps([loc.model_dump(mode='json') for loc in locations])
-                )
-            except Exception as e:
-                logger.warning("Cache write failed", error=str(e))
+        await self._cache_set(
+            cache_key,
+            [loc.model_dump(mode='json') for loc in locations],
+            settings.REDIS_CACHE_TTL
+        )
         
         return locations
     
@@ -121,12 +156,7 @@ class AddressService:
             )
             location = existing.scalar_one_or_none()
             if location:
-                response = self._to_response(location)
-                response.h3_index = self.spatial.calculate_h3_indices(
-                    response.coordinates.latitude,
-                    response.coordinates.longitude
-                )
-                return response
+                return self._to_response(location)
         
         # Geocode based on what we have
         if address:
@@ -142,21 +172,8 @@ class AddressService:
         if not geocoded:
             raise ValueError("Could not geocode the provided location")
         
-        # Check if this place_id already exists
-        existing = await db.execute(
-            select(Location).where(Location.place_id == geocoded['place_id'])
-        )
-        location = existing.scalar_one_or_none()
-        
-        if not location:
-            location = await self._create_location_from_geocode(geocoded, db)
-        
-        response = self._to_response(location)
-        response.h3_index = self.spatial.calculate_h3_indices(
-            response.coordinates.latitude,
-            response.coordinates.longitude
-        )
-        return response
+        by_place_id = await self._get_or_create_locations([geocoded], db)
+        return self._to_response(by_place_id[geocoded['place_id']])
     
     async def find_locations_near(
         self,
@@ -174,17 +191,23 @@ class AddressService:
         query = text("""
             SELECT 
                 l.*,
+                ST_Y(l.coordinates) AS latitude,
+                ST_X(l.coordinates) AS longitude,
+                -- Reported distance stays on the spheroid; it only runs for the returned rows
                 ST_Distance(
                     l.coordinates::geography,
                     ST_GeogFromText(:point)
                 ) as distance_meters
             FROM locations l
+            -- Matches ix_locations_coordinates_geog; sphere math is plenty for the radius filter
             WHERE ST_DWithin(
                 l.coordinates::geography,
                 ST_GeogFromText(:point),
-                :radius
+                :radius,
+                false
             )
-            ORDER BY distance_meters
+            -- KNN walks the geography index in distance order and stops after :limit rows
+            ORDER BY l.coordinates::geography <-> ST_GeogFromText(:point)
             LIMIT :limit
         """)
         
@@ -197,14 +220,27 @@ class AddressService:
             }
         )
         
+        # The index filter and KNN order use the sphere; filter and order on the
+        # reported spheroid distance so the two always agree
+        rows = sorted(
+            (row for row in result.all() if row.distance_meters <= radius_meters),
+            key=lambda row: row.distance_meters
+        )
+        
+        # Get active users from Redis, one round-trip for every row
+        active_users = [0] * len(rows)
+        if self.redis and rows:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for row in rows:
+                        pipe.scard(f"location:{row.id}:users")
+                    active_users = await pipe.execute()
+            except Exception as e:
+                logger.warning("Failed to get active users", error=str(e))
+        
         locations = []
-        for row in result:
-            # Parse geometry using Shapely
-            geom = loads(row.coordinates.data) if hasattr(row.coordinates, 'data') else None
-            if geom:
-                coords = Coordinates(latitude=geom.y, longitude=geom.x)
-            else:
-                coords = Coordinates(latitude=0, longitude=0)
+        for row, users in zip(rows, active_users):
+            coords = Coordinates(latitude=row.latitude, longitude=row.longitude)
             
             location = LocationResponse(
                 id=row.id,
@@ -221,27 +257,180 @@ class AddressService:
                     postal_code=row.postal_code
                 ),
                 metadata=row.extra_metadata,
-                h3_index=self.spatial.calculate_h3_indices(coords.latitude, coords.longitude),
+                h3_index=self._h3_index(row, coords.latitude, coords.longitude),
                 created_at=row.created_at
             )
             
-            # Get active users from Redis
-            active_users = 0
-            if self.redis:
-                try:
-                    active_users = await self.redis.scard(f"location:{row.id}:users")
-                except Exception as e:
-                    logger.warning("Failed to get active users", error=str(e))
-            
             locations.append(ChatRoomAtLocationResponse(
                 location=location,
-                active_users=active_users or 0,
+                active_users=users or 0,
                 last_activity=None,  # TODO: Track this
                 distance_meters=row.distance_meters
             ))
         
         return locations
     
+    async def find_nearest_locations(
+        self,
+        coordinates: Coordinates,
+        k: int,
+        db: AsyncSession,
+        use_cache: bool = True
+    ) -> List[Tuple[LocationResponse, float]]:
+        """Find the k nearest locations using the PostGIS KNN operator"""
+        
+        # ~1m rounding lets repeat queries for the same spot share an entry
+        cache_key = self._cache_key(
+            "nearest", f"{coordinates.latitude:.5f}:{coordinates.longitude:.5f}:{k}"
+        )
+        if use_cache:
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                return [(LocationResponse(**loc), dist) for loc, dist in cached]
+        
+        target = func.Geography(func.ST_SetSRID(
+            func.ST_MakePoint(coordinates.longitude, coordinates.latitude), 4326
+        ))
+        location_geog = func.Geography(Location.coordinates)
+        distance = func.ST_Distance(location_geog, target).label("distance_meters")
+        
+        # <-> walks the geography GiST index (ix_locations_coordinates_geog) instead
+        # of scanning the table; the planar coordinates index is SP-GiST on PostGIS 3
+        query = (
+            select(Location, distance)
+            .order_by(location_geog.op("<->")(target))
+            .limit(k)
+        )
+        result = await db.execute(query)
+        
+        nearest = [(self._to_response(loc), float(dist)) for loc, dist in result]
+        # KNN orders by sphere distance; report in spheroid order
+        nearest.sort(key=lambda item: item[1])
+        
+        await self._cache_set(
+            cache_key,
+            [(loc.model_dump(mode='json'), dist) for loc, dist in nearest],
+            settings.SPATIAL_QUERY_CACHE_TTL
+        )
+        return nearest
+    
+    async def stream_locations(
+        self,
+        query,
+        db: AsyncSession,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[LocationResponse]:
+        """Stream query results through a server-side cursor, converting as rows arrive"""
+        
+        rows = await db.stream_scalars(query.execution_options(yield_per=chunk_size))
+        async for chunk in rows.partitions():
+            for response in self._to_response_batch(chunk):
+                yield response
+    
+    async def find_locations_in_polygon(
+        self,
+        polygon: Polygon,
+        limit: int,
+        db: AsyncSession,
+        use_cache: bool = True
+    ) -> List[LocationResponse]:
+        """Find locations inside a polygon with an index-backed PostGIS query"""
+        
+        cache_key = f"address:polygon:{hashlib.blake2b(polygon.wkb, digest_size=8).hexdigest()}:{limit}"
+        if use_cache:
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                return [LocationResponse(**item) for item in cached]
+        
+        within = func.ST_Within(
+            Location.coordinates, func.ST_GeomFromText(polygon.wkt, 4326)
+        )
+        
+        # The H3 cover narrows candidates on the btree index; ST_Within still decides,
+        # since H3 cell edges are geodesic and don't match the planar polygon exactly
+        cover = polygon_h3_cover(polygon.wkb)
+        if cover is not None:
+            interior, edge = cover
+            within = and_(
+                or_(Location.h3_index.in_(interior | edge), Location.h3_index.is_(None)),
+                within
+            )
+        
+        query = select(Location).where(within).limit(limit)
+        locations = [loc async for loc in self.stream_locations(query, db)]
+        
+        await self._cache_set(
+            cache_key,
+            [loc.model_dump(mode='json') for loc in locations],
+            settings.SPATIAL_QUERY_CACHE_TTL
+        )
+        return locations
+    
+    async def cluster_labels(
+        self,
+        location_ids: List[Any],
+        eps_meters: float,
+        min_samples: int,
+        db: AsyncSession
+    ) -> Dict[Any, Optional[int]]:
+        """DBSCAN cluster label per location id computed by ST_ClusterDBSCAN, None for noise"""
+        
+        # ST_ClusterDBSCAN is planar; cluster in Web Mercator with eps stretched
+        # by 1/cos(latitude) at the centre of the selection
+        query = text("""
+            WITH selected AS (
+                SELECT id, coordinates FROM locations WHERE id = ANY(:ids)
+            ),
+            scale AS (
+                SELECT CAST(:eps AS double precision) / cos(radians(avg(ST_Y(coordinates)))) AS eps
+                FROM selected
+            )
+            SELECT
+                s.id,
+                ST_ClusterDBSCAN(
+                    ST_Transform(s.coordinates, 3857),
+                    eps := scale.eps,
+                    minpoints := :min_samples
+                ) OVER () AS cluster_id
+            FROM selected s, scale
+        """)
+        result = await db.execute(
+            query, {"ids": list(location_ids), "eps": eps_meters, "min_samples": min_samples}
+        )
+        return dict(result.tuples())
+    
+    async def find_clusters(
+        self,
+        locations: List[LocationResponse],
+        db: AsyncSession,
+        eps_meters: float = 500,
+        min_samples: int = 3,
+        in_database: Optional[bool] = None
+    ) -> List[SpatialCluster]:
+        """Find spatial clusters, labelling in PostGIS for large location sets
+        
+        in_database forces either path; by default PostGIS is used from
+        DATABASE_CLUSTERING_MIN_LOCATIONS locations. Cluster geometry is built
+        in a worker thread either way.
+        """
+        if in_database is None:
+            in_database = len(locations) >= DATABASE_CLUSTERING_MIN_LOCATIONS
+        
+        if not in_database:
+            return await asyncio.to_thread(
+                self.spatial.find_clusters, locations, eps_meters, min_samples
+            )
+        
+        if len(locations) < min_samples:
+            return []
+        
+        labels = await self.cluster_labels(
+            [loc.id for loc in locations], eps_meters, min_samples, db
+        )
+        return await asyncio.to_thread(
+            self.spatial.build_clusters, locations, [labels.get(loc.id) for loc in locations]
+        )
+    
     async def batch_create_locations(
         self,
         addresses: List[str],
@@ -250,112 +439,152 @@ class AddressService:
         """Batch create multiple locations"""
         
         # Batch geocode
-        geocoded_results = await self.geocoder.batch_geocode(addresses)
+        geocoded_results = [g for g in await self.geocoder.batch_geocode(addresses) if g]
+        if not geocoded_results:
+            return []
         
-        locations = []
-        for geocoded in geocoded_results:
-            if geocoded:
-                # Check if exists
-                existing = await db.execute(
-                    select(Location).where(Location.place_id == geocoded['place_id'])
-                )
-                location = existing.scalar_one_or_none()
-                
-                if not location:
-                    location = await self._create_location_from_geocode(geocoded, db)
-                
-                response = self._to_response(location)
-                response.h3_index = self.spatial.calculate_h3_indices(
-                    response.coordinates.latitude,
-                    response.coordinates.longitude
-                )
-                locations.append(response)
+        by_place_id = await self._get_or_create_locations(geocoded_results, db)
         
-        return locations
+        return [
+            self._to_response(by_place_id[geocoded['place_id']])
+            for geocoded in geocoded_results
+        ]
     
-    async def _create_location_from_geocode(
-        self, 
-        geocoded: dict, 
+    async def _get_or_create_locations(
+        self,
+        geocoded_results: List[dict],
         db: AsyncSession
-    ) -> Location:
-        """Create new location from geocoded data"""
+    ) -> Dict[str, Location]:
+        """Locations for geocoded results keyed by place_id, creating missing ones"""
         
-        coords = geocoded['coordinates']
-        components = geocoded['components']
+        place_ids = {g['place_id'] for g in geocoded_results}
+        if not place_ids:
+            return {}
         
-        # Create Shapely point
-        point = Point(coords['longitude'], coords['latitude'])
-        
-        # Convert to WKT for PostGIS
-        wkt_point = WKTElement(point.wkt, srid=4326)
-        
-        location = Location(
-            place_id=geocoded['place_id'],
-            address_string=geocoded['address_string'],
-            normalized_address=self._normalize_address(geocoded['address_string']),
-            coordinates=wkt_point,
-            street_number=components.get('street_number'),
-            street_name=components.get('street_name'),
-            city=components.get('city'),
-            state=components.get('state'),
-            country=components.get('country'),
-            postal_code=components.get('postal_code'),
-            extra_metadata=geocoded.get('metadata', {})
+        # One lookup for every result instead of a query per place_id
+        existing = await db.scalars(
+            select(Location).where(Location.place_id.in_(place_ids))
         )
+        by_place_id = {location.place_id: location for location in existing}
         
-        db.add(location)
+        missing = [g for g in geocoded_results if g['place_id'] not in by_place_id]
+        if missing:
+            by_place_id.update(await self._create_locations_from_geocode(missing, db))
+        
+        return by_place_id
+    
+    async def _create_locations_from_geocode(
+        self, 
+        geocoded_results: List[dict], 
+        db: AsyncSession
+    ) -> Dict[str, Location]:
+        """Create new locations from geocoded data in a single statement"""
+        
+        # One upsert for the whole batch; a place_id may only appear once per statement
+        rows = {g['place_id']: self._location_values(g) for g in geocoded_results}
+        stmt = pg_insert(Location).values(list(rows.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Location.place_id],
+            # No-op update so RETURNING also yields rows created concurrently
+            set_={"place_id": stmt.excluded.place_id}
+        ).returning(Location, Location.latitude, Location.longitude)
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        by_place_id = {}
+        for location, lat, lng in result:
+            # RETURNING doesn't load column properties onto the entity itself
+            set_committed_value(location, 'latitude', lat)
+            set_committed_value(location, 'longitude', lng)
+            by_place_id[location.place_id] = location
         await db.commit()
-        await db.refresh(location)
         
-        logger.info(
-            "Created new location",
-            place_id=location.place_id,
-            address=location.address_string
-        )
+        logger.info("Created new locations", count=len(by_place_id))
         
-        return location
+        return by_place_id
+    
+    def _location_values(self, geocoded: dict) -> Dict[str, Any]:
+        """Column values for a location row from geocoded data"""
+        
+        coords = geocoded['coordinates']
+        components = geocoded['components']
+        
+        return {
+            'place_id': geocoded['place_id'],
+            'address_string': geocoded['address_string'],
+            'normalized_address': self._normalize_address(geocoded['address_string']),
+            # Bound as numeric parameters; PostGIS builds the point without parsing WKT
+            'coordinates': func.ST_SetSRID(
+                func.ST_MakePoint(coords['longitude'], coords['latitude']), 4326
+            ),
+            'h3_index': h3_int.latlng_to_cell(
+                coords['latitude'], coords['longitude'], LOCATION_H3_RESOLUTION
+            ),
+            'street_number': components.get('street_number'),
+            'street_name': components.get('street_name'),
+            'city': components.get('city'),
+            'state': components.get('state'),
+            'country': components.get('country'),
+            'postal_code': components.get('postal_code'),
+            'extra_metadata': geocoded.get('metadata', {})
+        }
     
     def _normalize_address(self, address: str) -> str:
         """Normalize address for matching"""
         # Enhanced normalization
         normalized = address.lower().strip()
         
-        # Common abbreviations
-        replacements = {
-            ' street': ' st',
-            ' avenue': ' ave',
-            ' road': ' rd',
-            ' boulevard': ' blvd',
-            ' drive': ' dr',
-            ' lane': ' ln',
-            ' court': ' ct',
-            ' north ': ' n ',
-            ' south ': ' s ',
-            ' east ': ' e ',
-            ' west ': ' w ',
-        }
-        
-        for old, new in replacements.items():
-            normalized = normalized.replace(old, new)
+        # All abbreviations in a single pass
+        normalized = _ADDRESS_ABBREVIATION_RE.sub(
+            lambda m: ADDRESS_ABBREVIATIONS[m.group(0)], normalized
+        )
         
         # Remove extra spaces
         normalized = ' '.join(normalized.split())
         
         return normalized
     
+    def _lat_lng(self, location: Location) -> Tuple[float, float]:
+        """(lat, lng) of a location, as extracted by PostGIS when the row was loaded"""
+        return location.latitude, location.longitude
+    
+    def _h3_index(self, location: Location, lat: float, lng: float) -> str:
+        """Response H3 index, derived from the stored cell when there is one"""
+        if location.h3_index is not None:
+            return h3.int_to_str(h3_int.cell_to_parent(location.h3_index, DEFAULT_H3_RESOLUTION))
+        return self.spatial.calculate_h3_indices(lat, lng, DEFAULT_H3_RESOLUTION)
+    
+    def _to_response_batch(self, locations: List[Location]) -> List[LocationResponse]:
+        """Convert database rows to response models without re-validating them.
+        
+        Rows come from our own table, so field types are already correct and
+        Pydantic validation can be skipped with model_construct.
+        """
+        responses = []
+        for location in locations:
+            lat, lng = self._lat_lng(location)
+            responses.append(LocationResponse.model_construct(
+                id=location.id,
+                place_id=location.place_id,
+                address_string=location.address_string,
+                normalized_address=location.normalized_address,
+                coordinates=Coordinates.model_construct(latitude=lat, longitude=lng),
+                components=AddressComponents.model_construct(
+                    street_number=location.street_number,
+                    street_name=location.street_name,
+                    city=location.city,
+                    state=location.state,
+                    country=location.country,
+                    postal_code=location.postal_code
+                ),
+                metadata=location.extra_metadata or {},
+                h3_index=self._h3_index(location, lat, lng),
+                created_at=location.created_at
+            ))
+        return responses
+    
     def _to_response(self, location: Location) -> LocationResponse:
-        """Convert database model to response model"""
+        """Validate a database row into a response model"""
         
-        # Extract coordinates using Shapely
-        if hasattr(location.coordinates, 'data'):
-            # Handle different geometry formats
-            try:
-                geom = loads(location.coordinates.data)
-                lat, lng = geom.y, geom.x
-            except:
-                lat, lng = 0, 0
-        else:
-            lat, lng = 0, 0
+        lat, lng = self._lat_lng(location)
         
         return LocationResponse(
             id=location.id,
@@ -372,5 +601,11 @@ class AddressService:
                 postal_code=location.postal_code
             ),
             metadata=location.extra_metadata or {},
+            h3_index=self._h3_index(location, lat, lng),
             created_at=location.created_at
-        )
\ No newline at end of file
+        )
+
+@lru_cache(maxsize=1)
+def get_address_service() -> AddressService:
+    """Process-wide AddressService shared by all routers"""
+    return AddressService()
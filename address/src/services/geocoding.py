@@ -1,17 +1,51 @@
 from abc import ABC, abstractmethod
+import asyncio
+import importlib.util
 from typing import List, Optional, Dict, Any
-import googlemaps
 import httpx
-from geopy import Nominatim
+import orjson
 import structlog
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
 
 from ..config import settings
 
 logger = structlog.get_logger()
 
+# HTTP/2 multiplexes concurrent batch geocodes over one connection when h2 is installed
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def _is_retryable(exc: BaseException) -> bool:
+    """Retry throttling, server errors and dropped connections"""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, httpx.TransportError)
+
+# Jittered exponential backoff so concurrent batch requests don't retry in lockstep
+_retry = retry(
+    retry=retry_if_exception(_is_retryable),
+    wait=wait_random_exponential(multiplier=0.5, max=5),
+    stop=stop_after_attempt(3),
+    reraise=True
+)
+
+def _http_client(base_url: str, **kwargs) -> httpx.AsyncClient:
+    """Pooled keep-alive client reused for every call to a provider"""
+    return httpx.AsyncClient(
+        base_url=base_url, http2=HTTP2_ENABLED, limits=HTTP_LIMITS, timeout=10.0, **kwargs
+    )
+
 class GeocodingProvider(ABC):
     """Abstract base class for geocoding providers"""
     
+    client: httpx.AsyncClient
+    
+    async def aclose(self):
+        """Close pooled connections"""
+        await self.client.aclose()
+    
     @abstractmethod
     async def geocode(self, address: str) -> Optional[Dict[str, Any]]:
         """Geocode an address"""
@@ -28,23 +62,37 @@ class GeocodingProvider(ABC):
         pass
     
     async def batch_geocode(self, addresses: List[str]) -> List[Optional[Dict[str, Any]]]:
-        """Batch geocode multiple addresses"""
-        results = []
-        for address in addresses:
-            result = await self.geocode(address)
-            results.append(result)
-        return results
+        """Batch geocode multiple addresses, a bounded number at a time"""
+        semaphore = asyncio.Semaphore(settings.GEOCODING_CONCURRENCY)
+        
+        async def geocode_one(address: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await self.geocode(address)
+        
+        return await asyncio.gather(*(geocode_one(address) for address in addresses))
 
 class GoogleMapsProvider(GeocodingProvider):
     """Google Maps geocoding provider"""
     
     def __init__(self, api_key: str):
-        self.client = googlemaps.Client(key=api_key)
+        self.api_key = api_key
+        self.client = _http_client("https://maps.googleapis.com/maps/api")
+    
+    @_retry
+    async def _get(self, path: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Call a Maps web service endpoint and return its results"""
+        response = await self.client.get(path, params={**params, 'key': self.api_key})
+        response.raise_for_status()
+        body = orjson.loads(response.content)
+        status = body.get('status')
+        if status not in ('OK', 'ZERO_RESULTS'):
+            raise RuntimeError(f"{status}: {body.get('error_message', '')}")
+        return body.get('results', [])
     
     async def geocode(self, address: str) -> Optional[Dict[str, Any]]:
         """Geocode using Google Maps API"""
         try:
-            results = self.client.geocode(address)
+            results = await self._get("/geocode/json", {'address': address})
             if results:
                 return self._format_result(results[0])
             return None
@@ -55,7 +103,7 @@ class GoogleMapsProvider(GeocodingProvider):
     async def reverse_geocode(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
         """Reverse geocode using Google Maps API"""
         try:
-            results = self.client.reverse_geocode((lat, lon))
+            results = await self._get("/geocode/json", {'latlng': f"{lat},{lon}"})
             if results:
                 return self._format_result(results[0])
             return None
@@ -66,9 +114,9 @@ class GoogleMapsProvider(GeocodingProvider):
     async def search_places(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Search places using Google Maps API"""
         try:
-            results = self.client.places(query)
+            results = await self._get("/place/textsearch/json", {'query': query})
             formatted = []
-            for result in results.get('results', [])[:limit]:
+            for result in results[:limit]:
                 formatted_result = self._format_place_result(result)
                 if formatted_result:
                     formatted.append(formatted_result)
@@ -138,14 +186,26 @@ class NominatimProvider(GeocodingProvider):
     """OpenStreetMap Nominatim geocoding provider"""
     
     def __init__(self, user_agent: str = "address-service"):
-        self.geolocator = Nominatim(user_agent=user_agent)
+        self.client = _http_client(
+            "https://nominatim.openstreetmap.org", headers={"User-Agent": user_agent}
+        )
+    
+    @_retry
+    async def _get(self, path: str, params: Dict[str, Any]) -> Any:
+        """Call a Nominatim endpoint and return the decoded JSON body"""
+        response = await self.client.get(
+            path, params={**params, 'format': 'json', 'addressdetails': 1}
+        )
+        response.raise_for_status()
+        return orjson.loads(response.content)
     
     async def geocode(self, address: str) -> Optional[Dict[str, Any]]:
         """Geocode using Nominatim"""
         try:
-            location = self.geolocator.geocode(address, exactly_one=True)
-            if location:
-                return self._format_result(location.raw, location.latitude, location.longitude)
+            results = await self._get("/search", {'q': address, 'limit': 1})
+            if results:
+                raw = results[0]
+                return self._format_result(raw, float(raw['lat']), float(raw['lon']))
             return None
         except Exception as e:
             logger.error("Nominatim geocoding failed", error=str(e))
@@ -154,9 +214,10 @@ class NominatimProvider(GeocodingProvider):
     async def reverse_geocode(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
         """Reverse geocode using Nominatim"""
         try:
-            location = self.geolocator.reverse(f"{lat}, {lon}", exactly_one=True)
-            if location:
-                return self._format_result(location.raw, lat, lon)
+            raw = await self._get("/reverse", {'lat': lat, 'lon': lon})
+            # Nominatim answers 200 with an "error" body when nothing is found
+            if raw and 'error' not in raw:
+                return self._format_result(raw, lat, lon)
             return None
         except Exception as e:
             logger.error("Nominatim reverse geocoding failed", error=str(e))
@@ -165,10 +226,10 @@ class NominatimProvider(GeocodingProvider):
     async def search_places(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Search places using Nominatim"""
         try:
-            locations = self.geolocator.geocode(query, exactly_one=False, limit=limit)
+            raws = await self._get("/search", {'q': query, 'limit': limit})
             results = []
-            for location in locations or []:
-                result = self._format_result(location.raw, location.latitude, location.longitude)
+            for raw in raws:
+                result = self._format_result(raw, float(raw['lat']), float(raw['lon']))
                 if result:
                     results.append(result)
             return results
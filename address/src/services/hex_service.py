@@ -1,9 +1,17 @@
 import h3
+from h3.api import basic_int as h3_int
+import math
+import numpy as np
+from functools import lru_cache
 from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, delete, select, update, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm.attributes import set_committed_value
+from redis import Redis, RedisError
 from ..hex_models import HexCell, UserHexLocation, HexLandmark, HexCellResponse, NeighborhoodInfo
 import logging
+import time
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
@@ -11,24 +19,64 @@ logger = logging.getLogger(__name__)
 # Default resolution for neighborhood chats
 DEFAULT_RESOLUTION = 8  # ~0.7km hexagons
 
+# Users count as present in a hex for this long after their last join
+PRESENCE_TIMEOUT_SECONDS = 30 * 60
+
+# Mean earth radius, as used by h3.great_circle_distance
+EARTH_RADIUS_KM = 6371.0088
+
+# 8-point compass, counter-clockwise from east in 45 degree steps
+COMPASS_DIRECTIONS = (
+    "east", "northeast", "north", "northwest",
+    "west", "southwest", "south", "southeast",
+)
+
+# Internally cells are uint64 H3 indices, matching the BIGINT columns; the string
+# form only appears at the API boundary
+
+@lru_cache(maxsize=65536)
+def _cell_boundary(h3_index: int) -> Tuple[Tuple[float, float], ...]:
+    """Boundary vertices of a hex cell; a pure function of the index"""
+    return h3_int.cell_to_boundary(h3_index)
+
+@lru_cache(maxsize=65536)
+def _cell_center(h3_index: int) -> Tuple[float, float]:
+    """(lat, lng) center of a hex cell"""
+    return h3_int.cell_to_latlng(h3_index)
+
+@lru_cache(maxsize=8192)
+def _ring(h3_index: int, k: int) -> Tuple[int, ...]:
+    """Cells within k steps of a hex cell, including the cell itself"""
+    return tuple(h3_int.grid_disk(h3_index, k))
+
+def _presence_key(h3_index: int) -> str:
+    """Redis sorted set of user_id -> last join time for a hex"""
+    return f"hex:{h3_index:x}:users"
+
 class HexagonalLocationService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, redis: Optional[Redis] = None):
         self.db = db
+        # When set, active user counts come from Redis; membership is still recorded in the database
+        self.redis = redis
     
     def get_hex_for_location(self, lat: float, lng: float, resolution: int = DEFAULT_RESOLUTION) -> str:
         """Convert coordinates to H3 hex index"""
         return h3.latlng_to_cell(lat, lng, resolution)
     
+    def get_hex_cell(self, h3_index: str) -> Optional[HexCell]:
+        """Look up a stored hex cell by its H3 index"""
+        return self.db.query(HexCell).filter_by(h3_index=h3.str_to_int(h3_index)).first()
+    
     def get_or_create_hex_cell(self, lat: float, lng: float, resolution: int = DEFAULT_RESOLUTION) -> HexCell:
         """Get or create a hex cell for the given coordinates"""
-        h3_index = self.get_hex_for_location(lat, lng, resolution)
+        h3_index = h3_int.latlng_to_cell(lat, lng, resolution)
         
         # Check if hex exists
         hex_cell = self.db.query(HexCell).filter_by(h3_index=h3_index).first()
         
         if not hex_cell:
             # Create new hex cell
-            center = h3.cell_to_latlng(h3_index)
+            center = _cell_center(h3_index)
             hex_cell = HexCell(
                 h3_index=h3_index,
                 resolution=resolution,
@@ -52,100 +100,158 @@ class HexagonalLocationService:
         # Get or create hex cell
         hex_cell = self.get_or_create_hex_cell(lat, lng, resolution)
         
-        # Update user location
-        user_location = self.db.query(UserHexLocation).filter_by(
-            user_id=user_id,
-            h3_index=hex_cell.h3_index
-        ).first()
+        now = datetime.utcnow()
         
-        if not user_location:
-            user_location = UserHexLocation(
-                user_id=user_id,
-                h3_index=hex_cell.h3_index
+        # Record membership or refresh last_active in one upsert; xmax = 0 only for fresh rows
+        joined = self.db.execute(
+            pg_insert(UserHexLocation)
+            .values(user_id=user_id, h3_index=hex_cell.h3_index)
+            .on_conflict_do_update(
+                index_elements=[UserHexLocation.user_id, UserHexLocation.h3_index],
+                set_={"last_active": now}
             )
-            self.db.add(user_location)
-            
-            # Increment active users
-            hex_cell.active_users = self.db.query(UserHexLocation).filter_by(
-                h3_index=hex_cell.h3_index
-            ).count() + 1
-        else:
-            user_location.last_seen = datetime.utcnow()
-        
-        # Update hex activity
-        hex_cell.last_activity = datetime.utcnow()
+            .returning(literal_column("xmax = 0"))
+        ).scalar_one()
+        
+        if joined:
+            # Atomic increment instead of recounting the hex's members
+            active_users = self.db.execute(
+                update(HexCell)
+                .where(HexCell.h3_index == hex_cell.h3_index)
+                .values(active_users=func.coalesce(HexCell.active_users, 0) + 1, updated_at=now)
+                .returning(HexCell.active_users)
+                .execution_options(synchronize_session=False)
+            ).scalar_one()
+            set_committed_value(hex_cell, "active_users", active_users)
+        
         self.db.commit()
         
+        if self.redis is not None:
+            # Membership stays in the database; Redis only serves the live count
+            try:
+                active_users = self._join_presence(user_id, hex_cell.h3_index)
+                set_committed_value(hex_cell, "active_users", active_users)
+            except RedisError as e:
+                logger.warning("Hex presence unavailable, using database: %s", e)
+        
         # Get hex info with neighbors
         return self._build_join_response(hex_cell, lat, lng)
     
+    def _join_presence(self, user_id: str, h3_index: int) -> int:
+        """Mark user_id present in a hex and return the hex's active user count"""
+        now = time.time()
+        key = _presence_key(h3_index)
+        
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zadd(key, {user_id: now})
+        pipe.zremrangebyscore(key, "-inf", now - PRESENCE_TIMEOUT_SECONDS)
+        pipe.expire(key, PRESENCE_TIMEOUT_SECONDS)
+        pipe.zcard(key)
+        return pipe.execute()[-1]
+    
+    def _active_counts(self, h3_indexes: List[int]) -> List[int]:
+        """Active user counts for several hexes in one Redis round-trip"""
+        since = time.time() - PRESENCE_TIMEOUT_SECONDS
+        
+        pipe = self.redis.pipeline(transaction=False)
+        for h3_index in h3_indexes:
+            pipe.zcount(_presence_key(h3_index), since, "+inf")
+        return pipe.execute()
+    
+    def get_active_users(self, hex_cell: HexCell) -> int:
+        """Current active user count for a stored hex cell"""
+        if self.redis is not None:
+            try:
+                return self._active_counts([hex_cell.h3_index])[0]
+            except RedisError as e:
+                logger.warning("Hex presence unavailable, using database: %s", e)
+        return hex_cell.active_users
+    
     def get_active_neighbors(self, h3_index: str, rings: int = 1) -> List[NeighborhoodInfo]:
         """Get active neighboring hex cells"""
+        return self._active_neighbors(h3.str_to_int(h3_index), rings)
+    
+    def _active_neighbors(self, h3_index: int, rings: int) -> List[NeighborhoodInfo]:
+        """Active neighbors of a hex, nearest first"""
         # Get neighbor indices
-        neighbors = set(h3.grid_disk(h3_index, rings)) - {h3_index}
+        neighbors = list(set(_ring(h3_index, rings)) - {h3_index})
         
-        # Query active neighbors
-        active_hexes = self.db.query(HexCell).filter(
-            and_(
-                HexCell.h3_index.in_(neighbors),
-                HexCell.active_users > 0
-            )
-        ).all()
+        active_hexes = None
+        if self.redis is not None:
+            try:
+                counts = self._active_counts(neighbors)
+                active = {n: count for n, count in zip(neighbors, counts) if count}
+                # Metadata only for the neighbors Redis reports as active
+                active_hexes = self.db.query(HexCell).filter(
+                    HexCell.h3_index.in_(active)
+                ).all() if active else []
+                for hex_cell in active_hexes:
+                    set_committed_value(hex_cell, "active_users", active[hex_cell.h3_index])
+            except RedisError as e:
+                logger.warning("Hex presence unavailable, using database: %s", e)
         
-        # Build neighbor info
-        center = h3.cell_to_latlng(h3_index)
-        neighbor_info = []
+        if active_hexes is None:
+            # Query active neighbors
+            active_hexes = self.db.query(HexCell).filter(
+                and_(
+                    HexCell.h3_index.in_(neighbors),
+                    HexCell.active_users > 0
+                )
+            ).all()
         
-        for hex_cell in active_hexes:
-            neighbor_center = h3.cell_to_latlng(hex_cell.h3_index)
-            distance = h3.great_circle_distance(center, neighbor_center, unit='km')
-            direction = self._get_direction(center, neighbor_center)
-            
+        if not active_hexes:
+            return []
+        
+        # Distances and directions for every neighbor at once from the stored centers
+        lat1, lng1 = np.radians(_cell_center(h3_index))
+        lats = np.radians(np.fromiter((c.center_lat for c in active_hexes), float, len(active_hexes)))
+        lngs = np.radians(np.fromiter((c.center_lng for c in active_hexes), float, len(active_hexes)))
+        dlat = lats - lat1
+        dlng = lngs - lng1
+        
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lats) * np.sin(dlng / 2) ** 2
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        sectors = np.rint(np.arctan2(dlat, dlng) / (np.pi / 4)).astype(int) & 7
+        
+        neighbor_info = []
+        for hex_cell, distance, sector in zip(active_hexes, distances.tolist(), sectors.tolist()):
+            neighbor_index = h3.int_to_str(hex_cell.h3_index)
             neighbor_info.append(NeighborhoodInfo(
-                h3_index=hex_cell.h3_index,
-                name=hex_cell.display_name or f"Hex {hex_cell.h3_index[:8]}",
+                h3_index=neighbor_index,
+                name=hex_cell.display_name or f"Hex {neighbor_index[:8]}",
                 active_users=hex_cell.active_users,
                 distance_km=round(distance, 1),
-                direction=direction
+                direction=COMPASS_DIRECTIONS[sector]
             ))
         
         return sorted(neighbor_info, key=lambda x: x.distance_km)
     
     def get_hex_boundary(self, h3_index: str) -> List[List[float]]:
         """Get the boundary coordinates of a hex cell"""
-        boundary = h3.cell_to_boundary(h3_index)
-        return [[lat, lng] for lat, lng in boundary]
+        return [[lat, lng] for lat, lng in _cell_boundary(h3.str_to_int(h3_index))]
     
     def cleanup_inactive_users(self, timeout_minutes: int = 30):
         """Remove users who haven't been seen recently"""
         cutoff = datetime.utcnow() - timedelta(minutes=timeout_minutes)
         
-        # Find inactive users
-        inactive = self.db.query(UserHexLocation).filter(
-            UserHexLocation.last_seen < cutoff
-        ).all()
-        
-        # Update hex cell counts
-        hex_updates = {}
-        for user_loc in inactive:
-            if user_loc.h3_index not in hex_updates:
-                hex_updates[user_loc.h3_index] = 0
-            hex_updates[user_loc.h3_index] += 1
-        
-        # Delete inactive users
-        self.db.query(UserHexLocation).filter(
-            UserHexLocation.last_seen < cutoff
-        ).delete()
-        
-        # Update hex active user counts
-        for h3_index, count in hex_updates.items():
-            hex_cell = self.db.query(HexCell).filter_by(h3_index=h3_index).first()
-            if hex_cell:
-                hex_cell.active_users = max(0, hex_cell.active_users - count)
+        # Delete inactive users and decrement their hex counts in one statement
+        deleted = delete(UserHexLocation).where(
+            UserHexLocation.last_active < cutoff
+        ).returning(UserHexLocation.h3_index).cte("deleted")
+        
+        removed = select(
+            deleted.c.h3_index, func.count().label("removed")
+        ).group_by(deleted.c.h3_index).cte("removed")
         
+        self.db.execute(
+            update(HexCell)
+            .where(HexCell.h3_index == removed.c.h3_index)
+            .values(active_users=func.greatest(0, HexCell.active_users - removed.c.removed))
+            .execution_options(synchronize_session=False)
+        )
         self.db.commit()
     
-    def _generate_hex_name(self, h3_index: str, lat: float, lng: float) -> str:
+    def _generate_hex_name(self, h3_index: int, lat: float, lng: float) -> str:
         """Generate a friendly name for the hex cell"""
         # Check for nearby landmarks
         landmarks = self.db.query(HexLandmark).filter_by(h3_index=h3_index).all()
@@ -155,7 +261,7 @@ class HexagonalLocationService:
             return f"{landmarks[0].name} Area"
         
         # Use resolution-based generic names
-        resolution = h3.get_resolution(h3_index)
+        resolution = h3_int.get_resolution(h3_index)
         if resolution <= 7:
             return "District Chat"
         elif resolution == 8:
@@ -163,15 +269,16 @@ class HexagonalLocationService:
         elif resolution >= 9:
             return "Local Chat"
         
-        return f"Area {h3_index[:6]}"
+        prefix = f"{h3_index:x}"[:6]
+        return f"Area {prefix}"
     
-    def _create_neighbor_relationships(self, h3_index: str):
+    def _create_neighbor_relationships(self, h3_index: int):
         """Pre-compute and store neighbor relationships"""
-        neighbors = set(h3.grid_disk(h3_index, 1)) - {h3_index}
-        center = h3.cell_to_latlng(h3_index)
+        neighbors = set(_ring(h3_index, 1)) - {h3_index}
+        center = _cell_center(h3_index)
         
         for neighbor in neighbors:
-            neighbor_center = h3.cell_to_latlng(neighbor)
+            neighbor_center = _cell_center(neighbor)
             direction = self._get_direction(center, neighbor_center)
             
             # Store relationship (if neighbor exists)
@@ -180,31 +287,26 @@ class HexagonalLocationService:
                 pass  # Implementation depends on schema
     
     def _get_direction(self, from_point: Tuple[float, float], to_point: Tuple[float, float]) -> str:
-        """Get cardinal direction from one point to another"""
+        """Get compass direction from one point to another"""
         lat1, lng1 = from_point
         lat2, lng2 = to_point
         
-        # Simple bearing calculation
-        dlng = lng2 - lng1
-        dlat = lat2 - lat1
-        
-        if abs(dlat) > abs(dlng):
-            return "north" if dlat > 0 else "south"
-        else:
-            return "east" if dlng > 0 else "west"
+        # Round the angle to the nearest 45 degree sector; & 7 wraps -1 to southeast
+        angle = math.atan2(lat2 - lat1, lng2 - lng1)
+        return COMPASS_DIRECTIONS[round(angle / (math.pi / 4)) & 7]
     
     def _build_join_response(self, hex_cell: HexCell, user_lat: float, user_lng: float) -> dict:
         """Build the response for joining a hex chat"""
         return {
             "hex_cell": HexCellResponse(
-                h3_index=hex_cell.h3_index,
+                h3_index=h3.int_to_str(hex_cell.h3_index),
                 resolution=hex_cell.resolution,
                 center={"lat": hex_cell.center_lat, "lng": hex_cell.center_lng},
                 display_name=hex_cell.display_name,
                 locality=hex_cell.locality,
                 active_users=hex_cell.active_users,
-                boundary=self.get_hex_boundary(hex_cell.h3_index)
+                boundary=[[lat, lng] for lat, lng in _cell_boundary(hex_cell.h3_index)]
             ),
-            "neighbors": self.get_active_neighbors(hex_cell.h3_index),
+            "neighbors": self._active_neighbors(hex_cell.h3_index, 1),
             "your_position": {"lat": user_lat, "lng": user_lng}
         }
\ No newline at end of file
@@ -1,14 +1,24 @@
 import geopandas as gpd
 import pandas as pd
-from shapely.geometry import Point, Polygon, MultiPoint
-from shapely.ops import unary_union
+from shapely.geometry import Polygon
+import shapely
+from shapely import wkb
 import h3
+from h3.api import basic_int as h3_int
 import folium
-from folium.plugins import HeatMap
+from folium.plugins import FastMarkerCluster, HeatMap
 import numpy as np
-from typing import List, Dict, Tuple, Optional, Any
+import pyproj
+from typing import List, Dict, Tuple, Optional, Any, FrozenSet, Hashable
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from operator import attrgetter
+import threading
 from sklearn.cluster import DBSCAN
+from sklearn.neighbors import BallTree
+from scipy.spatial import ConvexHull, QhullError
 import json
+import html
 
 from ..models import (
     Coordinates, 
@@ -21,11 +31,131 @@ import structlog
 
 logger = structlog.get_logger()
 
+# Mean Earth radius used to convert haversine (radian) distances to meters
+EARTH_RADIUS_METERS = 6_371_000.0
+
+# Resolution of H3 indices reported on locations and used for heatmaps (~5 km² hexagons)
+DEFAULT_H3_RESOLUTION = 7
+# Resolution of the H3 cell stored with each location (~0.1 km² hexagons)
+LOCATION_H3_RESOLUTION = 9
+# Beyond this many covering cells an IN (...) prefilter stops paying off
+MAX_POLYGON_COVER_CELLS = 5_000
+_latitude = attrgetter('coordinates.latitude')
+_longitude = attrgetter('coordinates.longitude')
+
+# Number of nearest-neighbor BallTrees kept per service
+NEAREST_INDEX_CACHE_SIZE = 8
+# Number of point STRtrees kept per service for repeated polygon queries
+POINT_INDEX_CACHE_SIZE = 8
+# Up to this many locations a direct haversine scan beats building or keying a BallTree
+NEAREST_BRUTE_FORCE_MAX = 2_048
+
+@lru_cache(maxsize=256)
+def polygon_h3_cover(
+    polygon_wkb: bytes,
+    resolution: int = LOCATION_H3_RESOLUTION
+) -> Optional[Tuple[FrozenSet[int], FrozenSet[int]]]:
+    """Split the H3 cells covering a polygon into (interior, edge) integer sets.
+    
+    Cells follow H3's geodesic edges, so the cover is a prefilter: points in either
+    set may still fall outside the planar polygon near its boundary and need an
+    exact containment test. Returns None when the cover is too large to be useful.
+    """
+    polygon = wkb.loads(polygon_wkb)
+    
+    # Cheap equirectangular area estimate so huge polygons bail out before covering
+    area_km2 = polygon.area * 111.32 ** 2 * np.cos(np.deg2rad(polygon.centroid.y))
+    if area_km2 / h3.average_hexagon_area(resolution, unit='km^2') > MAX_POLYGON_COVER_CELLS:
+        return None
+    
+    shape = h3.geo_to_h3shape(polygon)
+    overlap = h3_int.h3shape_to_cells_experimental(shape, resolution, contain='overlap')
+    if len(overlap) > MAX_POLYGON_COVER_CELLS:
+        return None
+    interior = frozenset(h3_int.h3shape_to_cells_experimental(shape, resolution, contain='full'))
+    return interior, frozenset(overlap) - interior
+
+def hull_area(coords: np.ndarray) -> float:
+    """Convex hull area of an (n, 2) coordinate array, 0 when degenerate"""
+    if len(coords) < 3:
+        return 0.0
+    try:
+        # For 2-D input Qhull reports the area as the hull "volume"
+        return float(ConvexHull(coords).volume)
+    except QhullError:
+        # Duplicate or collinear points span no area
+        return 0.0
+
+def haversine_nearest(
+    coords_rad: np.ndarray,
+    target_rad: np.ndarray,
+    k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """k nearest (lat, lon) radian coords to target by a direct haversine scan.
+    
+    Returns (distances in radians, indices), closest first.
+    """
+    lat, lon = coords_rad[:, 0].astype(np.float64), coords_rad[:, 1].astype(np.float64)
+    t_lat, t_lon = float(target_rad[0]), float(target_rad[1])
+    a = (np.sin((lat - t_lat) / 2) ** 2 +
+         np.cos(lat) * np.cos(t_lat) * np.sin((lon - t_lon) / 2) ** 2)
+    distances = 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    
+    if k < len(distances):
+        nearest = np.argpartition(distances, k - 1)[:k]
+    else:
+        nearest = np.arange(len(distances))
+    nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+    return distances[nearest], nearest
+
+# From this many locations markers are built client-side by FastMarkerCluster
+FAST_MARKER_MIN_LOCATIONS = 500
+# Leaflet marker for a FastMarkerCluster row of [lat, lon, address_html, place_id_html]
+FAST_MARKER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindPopup("<b>" + row[2] + "</b><br>ID: " + row[3]);
+    marker.bindTooltip(row[2]);
+    return marker;
+}
+"""
+
+@lru_cache(maxsize=1)
+def default_map_html() -> str:
+    """Rendered default map centered on North America, built once"""
+    return folium.Map(location=[40, -95], zoom_start=4)._repr_html_()
+
+# H3 index bit layout: 4-bit resolution at bit 52, then fifteen 3-bit digits
+# below it, with digits finer than the cell's resolution all set to 7
+_H3_RES_SHIFT = np.uint64(52)
+_H3_RES_MASK = np.uint64(0xF) << _H3_RES_SHIFT
+
+def h3_cell_resolutions(cells: np.ndarray) -> np.ndarray:
+    """Resolution of each uint64 H3 cell"""
+    return (cells & _H3_RES_MASK) >> _H3_RES_SHIFT
+
+def h3_cells_to_parent(cells: np.ndarray, resolution: int) -> np.ndarray:
+    """Vectorized h3 cell_to_parent for uint64 cells at or finer than resolution"""
+    unused_digits = np.uint64((1 << (3 * (15 - resolution))) - 1)
+    return (cells & ~_H3_RES_MASK) | (np.uint64(resolution) << _H3_RES_SHIFT) | unused_digits
+
 class SpatialAnalysisService:
     def __init__(self):
         # Set up coordinate reference systems
         self.wgs84 = "EPSG:4326"  # Lat/Lon
         self.web_mercator = "EPSG:3857"  # For distance calculations
+        
+        # Built once; CRS resolution and transformer setup dominate small transforms
+        self._to_mercator = pyproj.Transformer.from_crs(self.wgs84, self.web_mercator, always_xy=True)
+        self._to_wgs84 = pyproj.Transformer.from_crs(self.web_mercator, self.wgs84, always_xy=True)
+        
+        # Recently built BallTrees for nearest neighbor queries, keyed by location set
+        self._nn_indexes: "OrderedDict[Hashable, BallTree]" = OrderedDict()
+        # Point STRtrees for polygon queries, keyed by caller-supplied cache key
+        self._point_indexes: "OrderedDict[Hashable, shapely.STRtree]" = OrderedDict()
+        # The service is shared across threadpool requests; guards both LRUs.
+        # Trees are built outside the lock so slow builds don't serialize lookups
+        self._index_lock = threading.Lock()
     
     def locations_to_geodataframe(
         self, 
@@ -33,11 +163,8 @@ class SpatialAnalysisService:
     ) -> gpd.GeoDataFrame:
         """Convert locations to GeoPandas GeoDataFrame"""
         
-        # Create points from coordinates
-        points = [
-            Point(loc.coordinates.longitude, loc.coordinates.latitude)
-            for loc in locations
-        ]
+        # Create all points in one vectorized call from the coordinate arrays
+        points = gpd.points_from_xy(*self._lon_lat(locations), crs=self.wgs84)
         
         # Create GeoDataFrame
         gdf = gpd.GeoDataFrame(
@@ -48,12 +175,23 @@ class SpatialAnalysisService:
                 'city': [loc.components.city for loc in locations],
                 'h3_index': [loc.h3_index for loc in locations],
             },
-            geometry=points,
-            crs=self.wgs84
+            geometry=points
         )
         
         return gdf
     
+    def _lon_lat(self, locations: List[LocationResponse]) -> Tuple[np.ndarray, np.ndarray]:
+        """Longitude and latitude arrays for locations"""
+        n = len(locations)
+        lons = np.fromiter(map(_longitude, locations), dtype=np.float64, count=n)
+        lats = np.fromiter(map(_latitude, locations), dtype=np.float64, count=n)
+        return lons, lats
+    
+    def _project_xy(self, locations: List[LocationResponse]) -> np.ndarray:
+        """Web Mercator (x, y) meters for locations as an (n, 2) array"""
+        x, y = self._to_mercator.transform(*self._lon_lat(locations))
+        return np.column_stack((x, y))
+    
     def find_clusters(
         self,
         locations: List[LocationResponse],
@@ -65,55 +203,65 @@ class SpatialAnalysisService:
         if len(locations) < min_samples:
             return []
         
-        # Convert to GeoDataFrame
-        gdf = self.locations_to_geodataframe(locations)
+        # Perform DBSCAN clustering on great-circle distance; the ball tree
+        # answers each eps-neighborhood query without a pairwise distance matrix,
+        # and the neighborhood queries are spread across all cores
+        clustering = DBSCAN(
+            eps=eps_meters / EARTH_RADIUS_METERS,
+            min_samples=min_samples,
+            metric='haversine',
+            algorithm='ball_tree',
+            leaf_size=40,
+            n_jobs=-1
+        ).fit(self._coords_rad_f32(locations))
+        
+        return self.build_clusters(locations, clustering.labels_.tolist())
+    
+    def build_clusters(
+        self,
+        locations: List[LocationResponse],
+        labels: List[Optional[int]]
+    ) -> List[SpatialCluster]:
+        """Build cluster geometry from per-location cluster labels.
         
-        # Project to meter-based CRS for accurate distance calculations
-        gdf_projected = gdf.to_crs(self.web_mercator)
+        labels is aligned with locations; -1 or None marks noise, as produced by
+        scikit-learn DBSCAN or PostGIS ST_ClusterDBSCAN respectively.
+        """
         
-        # Extract coordinates for clustering
-        coords = np.array([[geom.x, geom.y] for geom in gdf_projected.geometry])
+        # Project to meter-based CRS for cluster geometry (centroid, radius, area)
+        projected = self._project_xy(locations)
         
-        # Perform DBSCAN clustering
-        clustering = DBSCAN(eps=eps_meters, min_samples=min_samples).fit(coords)
-        gdf['cluster'] = clustering.labels_
+        # Bucket location positions by label in one pass, skipping noise points
+        buckets: Dict[int, List[int]] = defaultdict(list)
+        for i, label in enumerate(labels):
+            if label is not None and label != -1:
+                buckets[label].append(i)
         
         # Process clusters
         clusters = []
-        for cluster_id in set(clustering.labels_):
-            if cluster_id == -1:  # Skip noise points
-                continue
-            
-            cluster_points = gdf[gdf['cluster'] == cluster_id]
-            cluster_locations = [
-                loc for loc in locations 
-                if str(loc.id) in cluster_points['id'].values
-            ]
+        for cluster_id, members in buckets.items():
+            cluster_locations = [locations[i] for i in members]
             
             # Calculate cluster properties
-            cluster_geom = MultiPoint(cluster_points.geometry.tolist())
-            centroid = cluster_geom.centroid
+            pts = projected[members]
+            cx, cy = pts.mean(axis=0)
             
             # Calculate radius (maximum distance from centroid)
-            distances = [
-                centroid.distance(point) 
-                for point in cluster_points.geometry
-            ]
-            radius = max(distances) if distances else 0
+            radius = float(np.hypot(pts[:, 0] - cx, pts[:, 1] - cy).max())
             
             # Calculate density (locations per square km)
-            area_sqm = cluster_geom.convex_hull.area
+            area_sqm = hull_area(pts)
             area_sqkm = area_sqm / 1_000_000
             density = len(cluster_locations) / area_sqkm if area_sqkm > 0 else 0
             
             # Convert centroid back to lat/lon
-            centroid_latlon = gpd.GeoSeries([centroid], crs=self.web_mercator).to_crs(self.wgs84)[0]
+            centroid_lon, centroid_lat = self._to_wgs84.transform(cx, cy)
             
             clusters.append(SpatialCluster(
                 cluster_id=int(cluster_id),
                 centroid=Coordinates(
-                    latitude=centroid_latlon.y,
-                    longitude=centroid_latlon.x
+                    latitude=centroid_lat,
+                    longitude=centroid_lon
                 ),
                 locations=cluster_locations,
                 radius_meters=radius,
@@ -126,88 +274,205 @@ class SpatialAnalysisService:
         self,
         lat: float,
         lon: float,
-        resolution: int = 7
+        resolution: int = DEFAULT_H3_RESOLUTION
     ) -> str:
         """Calculate H3 hex index for a coordinate"""
         return h3.latlng_to_cell(lat, lon, resolution)
     
+    def calculate_h3_indices_bulk(
+        self,
+        lats: np.ndarray,
+        lons: np.ndarray,
+        resolution: int = DEFAULT_H3_RESOLUTION
+    ) -> np.ndarray:
+        """Calculate integer H3 indices for arrays of coordinates as uint64"""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        latlng_to_cell = h3_int.latlng_to_cell
+        return np.fromiter(
+            (latlng_to_cell(lat, lon, resolution) for lat, lon in zip(lats.tolist(), lons.tolist())),
+            dtype=np.uint64,
+            count=len(lats)
+        )
+    
+    def _location_h3_cells(
+        self,
+        locations: List[LocationResponse],
+        resolution: int,
+        stored: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """uint64 H3 cells for locations, reusing known cells where possible.
+        
+        Known cells come from stored (aligned with locations, 0 where unknown) or
+        else from each location's h3_index. One at the requested or a finer
+        resolution only needs a parent lookup, done in bulk on the bit fields;
+        the rest are computed from coordinates in bulk.
+        """
+        if stored is None:
+            stored = np.fromiter(
+                (int(loc.h3_index, 16) if loc.h3_index else 0 for loc in locations),
+                dtype=np.uint64,
+                count=len(locations)
+            )
+        else:
+            stored = np.asarray(stored, dtype=np.uint64)
+        usable = (stored != 0) & (h3_cell_resolutions(stored) >= resolution)
+        
+        cells = np.zeros(len(locations), dtype=np.uint64)
+        cells[usable] = h3_cells_to_parent(stored[usable], resolution)
+        
+        missing = np.flatnonzero(~usable)
+        if len(missing):
+            lons, lats = self._lon_lat(locations)
+            cells[missing] = self.calculate_h3_indices_bulk(lats[missing], lons[missing], resolution)
+        return cells
+    
+    def _compact_sparse_cells(
+        self,
+        cells: np.ndarray,
+        counts: np.ndarray,
+        resolution: int,
+        max_count: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Merge complete families of sparse hexes into their compacted parents.
+        
+        Hexes with at most max_count locations are compacted with h3; each parent
+        takes the mean count of its children so densities stay per-hex comparable.
+        Dense hexes are kept at full resolution.
+        """
+        sparse = counts <= max_count
+        sparse_cells, sparse_counts = cells[sparse], counts[sparse].astype(np.float64)
+        compacted = np.array(h3_int.compact_cells(sparse_cells.tolist()), dtype=np.uint64)
+        compacted_res = h3_cell_resolutions(compacted)
+        
+        kept = np.ones(len(sparse_cells), dtype=bool)
+        out_cells, out_counts = [cells[~sparse]], [counts[~sparse].astype(np.float64)]
+        for parent_res in np.unique(compacted_res[compacted_res < resolution]).tolist():
+            parents = h3_cells_to_parent(sparse_cells, parent_res)
+            merged = np.isin(parents, compacted[compacted_res == parent_res])
+            kept &= ~merged
+            
+            unique_parents, inverse = np.unique(parents[merged], return_inverse=True)
+            totals = np.bincount(inverse, weights=sparse_counts[merged])
+            out_cells.append(unique_parents)
+            out_counts.append(totals / np.bincount(inverse))
+        
+        out_cells.append(sparse_cells[kept])
+        out_counts.append(sparse_counts[kept])
+        return np.concatenate(out_cells), np.concatenate(out_counts)
+    
     def create_h3_heatmap(
         self,
         locations: List[LocationResponse],
-        resolution: int = 7
+        resolution: int = DEFAULT_H3_RESOLUTION,
+        compact_below: Optional[int] = None,
+        cells: Optional[np.ndarray] = None
     ) -> Dict[str, float]:
-        """Create H3-based density heatmap"""
-        
-        # Count locations per H3 hex
-        hex_counts = {}
-        for loc in locations:
-            h3_index = self.calculate_h3_indices(
-                loc.coordinates.latitude,
-                loc.coordinates.longitude,
-                resolution
-            )
-            hex_counts[h3_index] = hex_counts.get(h3_index, 0) + 1
+        """Create H3-based density heatmap
+        
+        With compact_below set, hexes holding at most that many locations are
+        reported as coarser parent hexes wherever a whole family is present,
+        shrinking the map for large, sparse location sets. Callers that already
+        hold integer H3 cells for the locations (e.g. Location.h3_index) may pass
+        them as cells, aligned with locations and 0 where unknown.
+        """
         
-        # Normalize to density (locations per hex)
-        max_count = max(hex_counts.values()) if hex_counts else 1
-        hex_density = {
-            hex_id: count / max_count 
-            for hex_id, count in hex_counts.items()
-        }
+        if not locations:
+            return {}
+        
+        # Count locations per H3 hex on the uint64 indices
+        cells = self._location_h3_cells(locations, resolution, cells)
+        unique_cells, counts = np.unique(cells, return_counts=True)
+        max_count = counts.max()
+        
+        if compact_below is not None:
+            unique_cells, counts = self._compact_sparse_cells(
+                unique_cells, counts, resolution, compact_below
+            )
         
-        return hex_density
+        # Normalize to density (locations per hex), converting to strings only for the result
+        density = counts / max_count
+        return dict(zip(map(h3.int_to_str, unique_cells.tolist()), density.tolist()))
+    
+    def _get_point_index(
+        self,
+        locations: List[LocationResponse],
+        cache_key: Hashable
+    ) -> shapely.STRtree:
+        """Get an STRtree over the location points, reusing the one cached under cache_key"""
+        with self._index_lock:
+            tree = self._point_indexes.get(cache_key)
+            if tree is not None:
+                self._point_indexes.move_to_end(cache_key)
+                return tree
+        
+        tree = shapely.STRtree(shapely.points(*self._lon_lat(locations)))
+        with self._index_lock:
+            # Keep the first tree stored if another thread built one meanwhile
+            tree = self._point_indexes.setdefault(cache_key, tree)
+            self._point_indexes.move_to_end(cache_key)
+            if len(self._point_indexes) > POINT_INDEX_CACHE_SIZE:
+                self._point_indexes.popitem(last=False)
+        return tree
     
     def find_locations_in_polygon(
         self,
         locations: List[LocationResponse],
-        polygon: Polygon
+        polygon: Polygon,
+        cache_key: Optional[Hashable] = None
     ) -> List[LocationResponse]:
-        """Find all locations within a polygon"""
+        """Find all locations within a polygon
         
-        gdf = self.locations_to_geodataframe(locations)
+        Callers querying the same location set repeatedly may pass cache_key, as
+        for find_nearest_neighbors; candidates then come from a cached STRtree
+        instead of testing every point.
+        """
         
-        # Create polygon GeoDataFrame
-        poly_gdf = gpd.GeoDataFrame([1], geometry=[polygon], crs=self.wgs84)
+        if not locations:
+            return []
         
-        # Spatial join
-        locations_in_poly = gpd.sjoin(
-            gdf, 
-            poly_gdf, 
-            predicate='within'
-        )
+        if cache_key is not None:
+            tree = self._get_point_index(locations, cache_key)
+            indices = np.sort(tree.query(polygon, predicate='contains'))
+            return [locations[i] for i in indices.tolist()]
         
-        # Return matching locations
-        matching_ids = set(locations_in_poly['id'].values)
-        return [
-            loc for loc in locations 
-            if str(loc.id) in matching_ids
-        ]
+        # Prepared point-in-polygon test over raw coordinate arrays in one call
+        lons, lats = self._lon_lat(locations)
+        shapely.prepare(polygon)
+        mask = shapely.contains_xy(polygon, lons, lats)
+        
+        return [loc for loc, inside in zip(locations, mask.tolist()) if inside]
     
     def calculate_service_area(
         self,
         locations: List[LocationResponse],
-        buffer_meters: float = 1000
+        buffer_meters: float = 1000,
+        quad_segs: int = 8
     ) -> Tuple[Polygon, float]:
-        """Calculate service area coverage"""
+        """Calculate service area coverage
+        
+        quad_segs sets the segments per quarter circle of each buffer; lower
+        values give coarser circles and a faster union.
+        """
         
         if not locations:
             return None, 0.0
         
-        gdf = self.locations_to_geodataframe(locations)
-        gdf_projected = gdf.to_crs(self.web_mercator)
-        
-        # Buffer each point
-        buffered = gdf_projected.buffer(buffer_meters)
+        # Buffer all points in one vectorized call
+        buffered = shapely.buffer(
+            shapely.points(self._project_xy(locations)), buffer_meters, quad_segs=quad_segs
+        )
         
-        # Union all buffers
-        service_area = unary_union(buffered)
+        # Union all buffers in a single aggregate pass
+        service_area = shapely.unary_union(buffered)
         
         # Calculate area in square kilometers
         area_sqkm = service_area.area / 1_000_000
         
         # Convert back to lat/lon
-        service_area_gdf = gpd.GeoDataFrame([1], geometry=[service_area], crs=self.web_mercator)
-        service_area_latlon = service_area_gdf.to_crs(self.wgs84).geometry[0]
+        service_area_latlon = shapely.transform(
+            service_area, self._to_wgs84.transform, interleaved=False
+        )
         
         return service_area_latlon, area_sqkm
     
@@ -220,25 +485,32 @@ class SpatialAnalysisService:
         """Create interactive Folium map"""
         
         if not locations:
-            # Default map centered on North America
-            m = folium.Map(location=[40, -95], zoom_start=4)
-            return m._repr_html_()
+            return default_map_html()
         
         # Calculate map center
-        lats = [loc.coordinates.latitude for loc in locations]
-        lons = [loc.coordinates.longitude for loc in locations]
-        center = [np.mean(lats), np.mean(lons)]
+        lons, lats = self._lon_lat(locations)
+        center = [float(lats.mean()), float(lons.mean())]
+        lats, lons = lats.tolist(), lons.tolist()
         
         # Create map
         m = folium.Map(location=center, zoom_start=12)
         
-        # Add location markers
-        for loc in locations:
-            folium.Marker(
-                [loc.coordinates.latitude, loc.coordinates.longitude],
-                popup=f"<b>{loc.address_string}</b><br>ID: {loc.place_id}",
-                tooltip=loc.address_string
+        # Add location markers; large sets ship as one JSON array rendered by Leaflet
+        if len(locations) >= FAST_MARKER_MIN_LOCATIONS:
+            FastMarkerCluster(
+                data=[
+                    [lat, lon, html.escape(loc.address_string), html.escape(loc.place_id)]
+                    for loc, lat, lon in zip(locations, lats, lons)
+                ],
+                callback=FAST_MARKER_CALLBACK
             ).add_to(m)
+        else:
+            for loc, lat, lon in zip(locations, lats, lons):
+                folium.Marker(
+                    [lat, lon],
+                    popup=f"<b>{loc.address_string}</b><br>ID: {loc.place_id}",
+                    tooltip=loc.address_string
+                ).add_to(m)
         
         # Add clusters if provided
         if clusters:
@@ -263,40 +535,73 @@ class SpatialAnalysisService:
         
         return m._repr_html_()
     
+    def _coords_rad_f32(self, locations: List[LocationResponse]) -> np.ndarray:
+        """Contiguous float32 (n, 2) array of (lat, lon) in radians for haversine indexes"""
+        lons, lats = self._lon_lat(locations)
+        return np.deg2rad(np.column_stack((lats, lons)).astype(np.float32))
+    
+    def _get_nearest_index(
+        self,
+        locations: List[LocationResponse],
+        cache_key: Optional[Hashable] = None
+    ) -> BallTree:
+        """Get a haversine BallTree for the locations, reusing a cached one if unchanged.
+        
+        Callers that can version their location set cheaply may pass cache_key; it
+        must change whenever the locations or their order change. Otherwise the key
+        is derived from the ids and coordinates.
+        """
+        coords = None
+        if cache_key is None:
+            coords = self._coords_rad_f32(locations)
+            cache_key = (tuple(loc.id for loc in locations), coords.tobytes())
+        
+        with self._index_lock:
+            tree = self._nn_indexes.get(cache_key)
+            if tree is not None:
+                self._nn_indexes.move_to_end(cache_key)
+                return tree
+        
+        if coords is None:
+            coords = self._coords_rad_f32(locations)
+        tree = BallTree(coords, metric='haversine')
+        with self._index_lock:
+            # Keep the first tree stored if another thread built one meanwhile
+            tree = self._nn_indexes.setdefault(cache_key, tree)
+            self._nn_indexes.move_to_end(cache_key)
+            if len(self._nn_indexes) > NEAREST_INDEX_CACHE_SIZE:
+                self._nn_indexes.popitem(last=False)
+        return tree
+    
     def find_nearest_neighbors(
         self,
         target: Coordinates,
         locations: List[LocationResponse],
-        k: int = 5
+        k: int = 5,
+        cache_key: Optional[Hashable] = None
     ) -> List[Tuple[LocationResponse, float]]:
         """Find k nearest neighbors using spatial index"""
         
         if not locations:
             return []
         
-        # Convert to GeoDataFrame
-        gdf = self.locations_to_geodataframe(locations)
-        
-        # Create target point
-        target_point = Point(target.longitude, target.latitude)
-        
-        # Project to meters for accurate distance
-        gdf_projected = gdf.to_crs(self.web_mercator)
-        target_projected = gpd.GeoSeries([target_point], crs=self.wgs84).to_crs(self.web_mercator)[0]
-        
-        # Calculate distances
-        gdf_projected['distance'] = gdf_projected.geometry.distance(target_projected)
+        k = min(k, len(locations))
+        target_rad = np.deg2rad(np.array([[target.latitude, target.longitude]], dtype=np.float32))
         
-        # Sort by distance and get top k
-        nearest = gdf_projected.nsmallest(k, 'distance')
+        if len(locations) <= NEAREST_BRUTE_FORCE_MAX:
+            # Small sets: one vectorized pass, no index to build or key
+            distances, indices = haversine_nearest(self._coords_rad_f32(locations), target_rad[0], k)
+        else:
+            # Query the index with the target in radians; distances come back in radians
+            tree = self._get_nearest_index(locations, cache_key)
+            distances, indices = tree.query(target_rad, k=k)
+            distances, indices = distances[0], indices[0]
         
-        # Return locations with distances
-        result = []
-        for idx, row in nearest.iterrows():
-            loc = next(l for l in locations if str(l.id) == row['id'])
-            result.append((loc, row['distance']))
-        
-        return result
+        # Return locations with distances in meters
+        return [
+            (locations[idx], float(dist * EARTH_RADIUS_METERS))
+            for dist, idx in zip(distances.tolist(), indices.tolist())
+        ]
     
     def calculate_spatial_statistics(
         self,
@@ -312,26 +617,21 @@ class SpatialAnalysisService:
                 'mean_nearest_neighbor_distance': 0
             }
         
-        gdf = self.locations_to_geodataframe(locations)
-        gdf_projected = gdf.to_crs(self.web_mercator)
+        coords = self._project_xy(locations)
         
         # Coverage area (convex hull)
-        all_points = MultiPoint(gdf_projected.geometry.tolist())
-        convex_hull = all_points.convex_hull
-        area_sqkm = convex_hull.area / 1_000_000
+        area_sqkm = hull_area(coords) / 1_000_000
         
         # Density
         density = len(locations) / area_sqkm if area_sqkm > 0 else 0
         
-        # Mean nearest neighbor distance
-        distances = []
-        for idx, point in gdf_projected.iterrows():
-            others = gdf_projected[gdf_projected.index != idx]
-            if len(others) > 0:
-                nearest_dist = others.geometry.distance(point.geometry).min()
-                distances.append(nearest_dist)
-        
-        mean_nn_distance = np.mean(distances) if distances else 0
+        # Mean great-circle nearest neighbor distance in meters; Web Mercator would
+        # overstate it by 1/cos(latitude). k=2 because each point's nearest hit is itself
+        mean_nn_distance = 0
+        if len(locations) > 1:
+            coords_rad = self._coords_rad_f32(locations)
+            distances, _ = self._get_nearest_index(locations).query(coords_rad, k=2)
+            mean_nn_distance = float(distances[:, 1].mean() * EARTH_RADIUS_METERS)
         
         return {
             'total_locations': len(locations),
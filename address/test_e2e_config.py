@@ -2,10 +2,18 @@
 Configuration for E2E tests
 """
 import os
-from typing import Dict, Any
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Mapping, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Settings are read-only so suites can share them; data that is sent as request
+# payloads stays in plain dicts and tuples so it serializes as JSON
 
 # Test configuration
-TEST_CONFIG = {
+TEST_CONFIG = MappingProxyType({
     "base_url": os.getenv("TEST_BASE_URL", "http://localhost:8000"),
     "timeout": int(os.getenv("TEST_TIMEOUT", "30")),
     "max_retries": int(os.getenv("TEST_MAX_RETRIES", "30")),
@@ -13,10 +21,10 @@ TEST_CONFIG = {
     "batch_size": int(os.getenv("TEST_BATCH_SIZE", "10")),
     "concurrent_requests": int(os.getenv("TEST_CONCURRENT_REQUESTS", "10")),
     "cleanup_test_data": os.getenv("TEST_CLEANUP", "true").lower() == "true",
-}
+})
 
 # Test data for NYC locations
-NYC_TEST_LOCATIONS = [
+NYC_TEST_LOCATIONS = (
     {
         "name": "Empire State Building",
         "address": "Empire State Building, New York, NY",
@@ -88,33 +96,33 @@ NYC_TEST_LOCATIONS = [
         "lat": 40.7115,
         "lon": -74.0134,
         "category": "memorial"
-    }
-]
+    },
+)
 
-# Test polygons for spatial testing
-TEST_POLYGONS = {
-    "manhattan": [
-        [-74.0479, 40.6892],  # Bottom left
-        [-73.9441, 40.6892],  # Bottom right
-        [-73.9441, 40.8176],  # Top right
-        [-74.0479, 40.8176],  # Top left
-        [-74.0479, 40.6892]   # Close polygon
-    ],
-    "central_park": [
-        [-73.9812, 40.7681],  # SW corner
-        [-73.9481, 40.7681],  # SE corner
-        [-73.9481, 40.7967],  # NE corner
-        [-73.9812, 40.7967],  # NW corner
-        [-73.9812, 40.7681]   # Close polygon
-    ],
-    "financial_district": [
-        [-74.0200, 40.7000],  # SW corner
-        [-74.0050, 40.7000],  # SE corner
-        [-74.0050, 40.7150],  # NE corner
-        [-74.0200, 40.7150],  # NW corner
-        [-74.0200, 40.7000]   # Close polygon
-    ]
-}
+# Test polygons for spatial testing, as (lon, lat) rings
+TEST_POLYGONS = MappingProxyType({
+    "manhattan": (
+        (-74.0479, 40.6892),  # Bottom left
+        (-73.9441, 40.6892),  # Bottom right
+        (-73.9441, 40.8176),  # Top right
+        (-74.0479, 40.8176),  # Top left
+        (-74.0479, 40.6892)   # Close polygon
+    ),
+    "central_park": (
+        (-73.9812, 40.7681),  # SW corner
+        (-73.9481, 40.7681),  # SE corner
+        (-73.9481, 40.7967),  # NE corner
+        (-73.9812, 40.7967),  # NW corner
+        (-73.9812, 40.7681)   # Close polygon
+    ),
+    "financial_district": (
+        (-74.0200, 40.7000),  # SW corner
+        (-74.0050, 40.7000),  # SE corner
+        (-74.0050, 40.7150),  # NE corner
+        (-74.0200, 40.7150),  # NW corner
+        (-74.0200, 40.7000)   # Close polygon
+    )
+})
 
 # Test bounding boxes
 TEST_BOUNDING_BOXES = {
@@ -236,18 +244,30 @@ ERROR_TEST_CASES = [
     }
 ]
 
-def get_test_config() -> Dict[str, Any]:
+def get_test_config() -> Mapping[str, Any]:
     """Get test configuration"""
     return TEST_CONFIG
 
-def get_test_locations() -> List[Dict[str, Any]]:
+def get_test_locations() -> Sequence[Mapping[str, Any]]:
     """Get test location data"""
     return NYC_TEST_LOCATIONS
 
-def get_test_polygons() -> Dict[str, List[List[float]]]:
+@lru_cache(maxsize=1)
+def get_test_coords() -> "np.ndarray":
+    """Read-only (lat, lon) array of NYC_TEST_LOCATIONS in order, for vectorized checks"""
+    import numpy as np
+    
+    coords = np.array(
+        [(location["lat"], location["lon"]) for location in NYC_TEST_LOCATIONS],
+        dtype=np.float64
+    )
+    coords.flags.writeable = False
+    return coords
+
+def get_test_polygons() -> Mapping[str, Tuple[Tuple[float, float], ...]]:
     """Get test polygon data"""
     return TEST_POLYGONS
 
-def get_test_bounding_boxes() -> Dict[str, Dict[str, float]]:
+def get_test_bounding_boxes() -> Mapping[str, Mapping[str, float]]:
     """Get test bounding box data"""
     return TEST_BOUNDING_BOXES
\ No newline at end of file
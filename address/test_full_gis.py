@@ -5,6 +5,7 @@ Tests full spatial database functionality
 """
 import asyncio
 import sys
+import time
 from typing import List
 import json
 
@@ -55,30 +56,29 @@ async def test_database_initialization():
         
         # Check that locations table exists
         async with engine.begin() as conn:
-            result = await conn.execute(text("""
+            result = await conn.stream(text("""
                 SELECT column_name, data_type, udt_name 
                 FROM information_schema.columns 
                 WHERE table_name = 'locations'
                 ORDER BY ordinal_position
             """))
             
-            columns = result.fetchall()
             print("   Table structure:")
-            for col in columns:
-                print(f"     {col.column_name}: {col.data_type} ({col.udt_name})")
+            async for col in result.mappings():
+                print(f"     {col['column_name']}: {col['data_type']} ({col['udt_name']})")
             
-            # Check spatial index
+            # Check spatial indexes (SP-GiST on PostGIS 3+, GiST otherwise)
             result = await conn.execute(text("""
                 SELECT indexname, indexdef 
                 FROM pg_indexes 
                 WHERE tablename = 'locations' 
-                AND indexdef LIKE '%gist%'
+                AND (indexdef LIKE '%spgist%' OR indexdef LIKE '%gist%')
             """))
             
-            spatial_indexes = result.fetchall()
+            spatial_indexes = result.mappings().all()
             print(f"   Spatial indexes: {len(spatial_indexes)}")
             for idx in spatial_indexes:
-                print(f"     {idx.indexname}")
+                print(f"     {idx['indexname']}")
         
         print("✅ Database schema initialized correctly")
         return True
@@ -93,7 +93,8 @@ async def create_test_locations():
     
     try:
         from src.services.address_service import AddressService
-        from src.database import get_db
+        from src.database import AsyncSessionLocal
+        from sqlalchemy import text
         
         # Test locations in NYC area
         test_addresses = [
@@ -160,12 +161,14 @@ async def create_test_locations():
         address_service = AddressService()
         created_locations = []
         
-        async for db in get_db():
-            for addr_data in test_addresses:
-                location = await address_service._create_location_from_geocode(addr_data, db)
+        async with AsyncSessionLocal() as db:
+            by_place_id = await address_service._create_locations_from_geocode(test_addresses, db)
+            for location in by_place_id.values():
                 created_locations.append(location)
                 print(f"   Created: {location.address_string}")
-            break
+            # Refresh planner statistics so the spatial indexes are picked up
+            await db.execute(text("ANALYZE locations"))
+            await db.commit()
         
         print(f"✅ Created {len(created_locations)} test locations")
         return created_locations
@@ -181,28 +184,46 @@ async def test_spatial_queries():
     try:
         from src.models import Coordinates
         from src.services.address_service import AddressService
-        from src.database import get_db
+        from src.database import AsyncSessionLocal
+        from sqlalchemy import text
         
         address_service = AddressService()
         
         # Test point: Empire State Building area
         search_coords = Coordinates(latitude=40.7484, longitude=-73.9857)
         
-        async for db in get_db():
-            # Test nearby search with different radii
-            radii = [500, 1000, 2000]  # meters
-            
-            for radius in radii:
-                nearby = await address_service.find_locations_near(
+        # Test nearby search with different radii
+        radii = [500, 1000, 2000]  # meters
+        
+        async def search_within(radius):
+            # An AsyncSession cannot run concurrent queries, so each gets its own
+            async with AsyncSessionLocal() as db:
+                return await address_service.find_locations_near(
                     search_coords, radius, 10, db
                 )
-                
-                print(f"   Within {radius}m: {len(nearby)} locations")
-                for loc in nearby:
-                    distance = loc.distance_meters
-                    print(f"     {loc.location.address_string}: {distance:.0f}m")
-            
-            break
+        
+        sweep = await asyncio.gather(*(search_within(radius) for radius in radii))
+        
+        for radius, nearby in zip(radii, sweep):
+            print(f"   Within {radius}m: {len(nearby)} locations")
+            for loc in nearby:
+                distance = loc.distance_meters
+                print(f"     {loc.location.address_string}: {distance:.0f}m")
+        
+        async with AsyncSessionLocal() as db:
+            # Expect an index scan on ix_locations_coordinates_geog rather than a
+            # sequential scan once the table has been analyzed
+            plan = await db.execute(text("""
+                EXPLAIN (ANALYZE, BUFFERS)
+                SELECT id FROM locations
+                WHERE ST_DWithin(coordinates::geography, ST_GeogFromText(:point), :radius, false)
+            """), {
+                'point': f"POINT({search_coords.longitude} {search_coords.latitude})",
+                'radius': radii[-1]
+            })
+            print("   Query plan:")
+            for line in plan.scalars():
+                print(f"     {line}")
         
         print("✅ Spatial queries working correctly")
         return True
@@ -252,16 +273,19 @@ async def test_spatial_functions():
             if buffer_result:
                 print(f"   Buffer operation: Generated polygon with {len(buffer_result)} characters")
             
-            # Test spatial containment
+            # Test spatial containment; the buffer is built once and its bbox (&&)
+            # lets the coordinates index prune candidates before ST_Contains
             result = await conn.execute(text("""
+                WITH buf AS MATERIALIZED (
+                    SELECT ST_Buffer(coordinates::geography, 2000)::geometry AS g
+                    FROM locations
+                    WHERE place_id = 'test_central_park'
+                )
                 SELECT 
                     COUNT(*) as locations_in_buffer
-                FROM locations l1, locations l2
-                WHERE l1.place_id = 'test_central_park'
-                AND ST_Contains(
-                    ST_Buffer(l1.coordinates::geography, 2000)::geometry,
-                    l2.coordinates
-                )
+                FROM buf, locations l2
+                WHERE buf.g && l2.coordinates
+                AND ST_Contains(buf.g, l2.coordinates)
             """))
             
             containment_result = result.scalar()
@@ -289,21 +313,28 @@ async def test_spatial_analysis_service():
     print("📊 Testing spatial analysis service...")
     
     try:
+        import numpy as np
         from src.services.spatial_service import SpatialAnalysisService
         from src.services.address_service import AddressService
-        from src.database import get_db
+        from src.database import AsyncSessionLocal
         
         spatial_service = SpatialAnalysisService()
         address_service = AddressService()
         
-        async for db in get_db():
+        async with AsyncSessionLocal() as db:
             # Get all test locations
             from sqlalchemy import select
             from src.database import Location
             
-            result = await db.execute(select(Location))
-            locations_db = result.scalars().all()
-            locations = [address_service._to_response(loc) for loc in locations_db]
+            # Server-side cursor; only one chunk of ORM rows is alive at a time
+            rows = await db.stream_scalars(
+                select(Location).execution_options(yield_per=1000)
+            )
+            locations = []
+            stored_cell_list = []
+            async for chunk in rows.partitions():
+                locations.extend(address_service._to_response_batch(chunk))
+                stored_cell_list.extend(loc.h3_index or 0 for loc in chunk)
             
             if not locations:
                 print("   No locations found for analysis")
@@ -320,8 +351,17 @@ async def test_spatial_analysis_service():
                       f"radius: {cluster.radius_meters:.0f}m, "
                       f"density: {cluster.density:.2f}/km²")
             
-            # Test H3 heatmap
-            density_map = spatial_service.create_h3_heatmap(locations, resolution=9)
+            # Same clustering run server-side with ST_ClusterDBSCAN
+            db_clusters = await address_service.find_clusters(
+                locations, db, eps_meters=1000, min_samples=2, in_database=True
+            )
+            print(f"   PostGIS ST_ClusterDBSCAN: {len(db_clusters)} clusters")
+            
+            # Test H3 heatmap, reusing the resolution 9 cells stored on each row
+            stored_cells = np.array(stored_cell_list, dtype=np.uint64)
+            density_map = spatial_service.create_h3_heatmap(
+                locations, resolution=9, cells=stored_cells
+            )
             print(f"   H3 heatmap: {len(density_map)} hexagons")
             
             # Test spatial statistics
@@ -341,8 +381,6 @@ async def test_spatial_analysis_service():
             print(f"   Nearest neighbors to Times Square:")
             for loc, dist in nearest:
                 print(f"     {loc.address_string}: {dist:.0f}m")
-            
-            break
         
         print("✅ Spatial analysis service working correctly")
         return True
@@ -356,7 +394,7 @@ async def test_api_endpoints():
     print("🌐 Testing API endpoints...")
     
     try:
-        from fastapi.testclient import TestClient
+        import httpx
         from src.main import app
         from unittest.mock import patch, AsyncMock
         
@@ -366,19 +404,23 @@ async def test_api_endpoints():
         async def mock_get_db():
             yield AsyncMock()
         
-        # Test with mocked endpoints
-        client = TestClient(app)
+        # One in-process client; the three requests are independent
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            health_response, spec_response, docs_response = await asyncio.gather(
+                client.get("/health/"),
+                client.get("/openapi.json"),
+                client.get("/docs")
+            )
         
         # Test health endpoint
-        response = client.get("/health/")
-        assert response.status_code == 200
-        data = response.json()
+        assert health_response.status_code == 200
+        data = health_response.json()
         print(f"   Health endpoint: {data['status']}")
         
         # Test OpenAPI spec
-        response = client.get("/openapi.json")
-        assert response.status_code == 200
-        spec = response.json()
+        assert spec_response.status_code == 200
+        spec = spec_response.json()
         
         # Count spatial endpoints
         spatial_paths = [path for path in spec['paths'].keys() if 'spatial' in path]
@@ -389,8 +431,7 @@ async def test_api_endpoints():
         print(f"   Spatial endpoints: {len(spatial_paths)}")
         
         # Test docs endpoint
-        response = client.get("/docs")
-        assert response.status_code == 200
+        assert docs_response.status_code == 200
         print(f"   Documentation available at /docs")
         
         print("✅ API endpoints configured correctly")
@@ -427,31 +468,49 @@ async def main():
     print("🗺️  COMPREHENSIVE POSTGIS CAPABILITIES TEST")
     print("=" * 60)
     
-    tests = [
-        ("Database Connection", test_database_connection),
-        ("Database Schema", test_database_initialization),
-        ("Test Data Creation", create_test_locations),
-        ("Spatial Queries", test_spatial_queries),
-        ("Advanced Spatial Functions", test_spatial_functions),
-        ("Spatial Analysis Service", test_spatial_analysis_service),
-        ("API Endpoints", test_api_endpoints),
-        ("Cleanup", cleanup_test_data),
+    # Setup runs in order, the read-only suites in between are independent
+    # and run concurrently, cleanup runs last
+    stages = [
+        [("Database Connection", test_database_connection)],
+        [("Database Schema", test_database_initialization)],
+        [("Test Data Creation", create_test_locations)],
+        [
+            ("Spatial Queries", test_spatial_queries),
+            ("Advanced Spatial Functions", test_spatial_functions),
+            ("Spatial Analysis Service", test_spatial_analysis_service),
+            ("API Endpoints", test_api_endpoints),
+        ],
+        [("Cleanup", cleanup_test_data)],
     ]
     
     passed = 0
-    total = len(tests)
+    total = sum(len(stage) for stage in stages)
     failed_tests = []
     
-    for test_name, test_func in tests:
-        print(f"\n{'='*20} {test_name} {'='*20}")
-        try:
-            if await test_func():
+    async def timed(test_func):
+        start = time.perf_counter()
+        result = await test_func()
+        return result, time.perf_counter() - start
+    
+    for stage in stages:
+        print(f"\n{'='*20} {', '.join(name for name, _ in stage)} {'='*20}")
+        outcomes = await asyncio.gather(
+            *(timed(test_func) for _, test_func in stage),
+            return_exceptions=True
+        )
+        
+        # Report in a fixed order regardless of completion order
+        for (test_name, _), outcome in zip(stage, outcomes):
+            if isinstance(outcome, BaseException):
+                print(f"❌ Test {test_name} crashed: {outcome}")
+                failed_tests.append(test_name)
+                continue
+            result, duration = outcome
+            print(f"   {test_name} finished in {duration:.2f}s")
+            if result:
                 passed += 1
             else:
                 failed_tests.append(test_name)
-        except Exception as e:
-            print(f"❌ Test {test_name} crashed: {e}")
-            failed_tests.append(test_name)
     
     print("\n" + "=" * 60)
     print(f"📊 FINAL RESULTS: {passed}/{total} tests passed")
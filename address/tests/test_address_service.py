@@ -0,0 +1,70 @@
+import asyncio
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.database import Location
+from src.models import Coordinates
+from src.services.address_service import AddressService
+
+
+@pytest.fixture
+def address_service():
+    return AddressService()
+
+
+@pytest.fixture
+def location():
+    row = Location(
+        id=uuid.uuid4(),
+        place_id="empire_state",
+        address_string="350 5th Ave, New York, NY",
+        normalized_address="350 5th avenue new york ny",
+        extra_metadata={"source": "test"},
+        created_at=datetime(2024, 1, 1),
+        updated_at=datetime(2024, 1, 1)
+    )
+    # Normally read by PostGIS when the row is loaded
+    row.latitude, row.longitude = 40.7484, -73.9857
+    return row
+
+
+class TestAddressService:
+
+    def test_to_response_returns_copies(self, address_service, location):
+        """Test each conversion builds its own response from the row"""
+        first = address_service._to_response(location)
+        first.metadata["source"] = "mutated"
+        first.coordinates.latitude = 0.0
+
+        second = address_service._to_response(location)
+
+        assert second is not first
+        assert second.metadata == {"source": "test"}
+        assert second.coordinates.latitude == 40.7484
+
+    def test_find_locations_near_orders_by_reported_distance(self, address_service):
+        """Test rows are filtered and ordered on the spheroid distance they report"""
+        def row(place_id, distance):
+            return SimpleNamespace(
+                id=uuid.uuid4(), place_id=place_id, address_string=place_id,
+                normalized_address=place_id, latitude=40.7484, longitude=-73.9857,
+                street_number=None, street_name=None, city=None, state=None,
+                country=None, postal_code=None, extra_metadata={}, h3_index=None,
+                created_at=datetime(2024, 1, 1), distance_meters=distance
+            )
+
+        # Sphere KNN order, with one row just past the radius on the spheroid
+        db = AsyncMock()
+        db.execute.return_value.all = lambda: [row("b", 500.4), row("a", 500.1), row("c", 1000.2)]
+        address_service.redis = None
+
+        nearby = asyncio.run(address_service.find_locations_near(
+            Coordinates(latitude=40.7484, longitude=-73.9857), 1000, 10, db
+        ))
+
+        assert [item.location.place_id for item in nearby] == ["a", "b"]
+        assert [item.distance_meters for item in nearby] == [500.1, 500.4]
@@ -0,0 +1,28 @@
+import asyncio
+
+import jwt
+from fastapi.security import HTTPAuthorizationCredentials
+
+from src.auth import get_current_user, _token_cache
+from src.config import settings
+
+
+def authenticate(token):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return asyncio.run(get_current_user(credentials))
+
+
+class TestGetCurrentUser:
+
+    def test_cached_user_is_not_shared(self):
+        """Test mutating a returned user doesn't leak into later cache hits"""
+        _token_cache.clear()
+        token = jwt.encode({"sub": "user123", "roles": "member"}, settings.SECRET_KEY, algorithm="HS256")
+
+        first = authenticate(token)
+        first["roles"] = "admin"
+        second = authenticate(token)
+
+        assert second["user_id"] == "user123"
+        assert second["roles"] == "member"
+        assert second is not first
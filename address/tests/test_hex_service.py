@@ -1,11 +1,14 @@
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql
 from datetime import datetime, timedelta
 import h3
+from h3.api import basic_int as h3_int
+from redis import RedisError
 
 from src.services.hex_service import HexagonalLocationService, DEFAULT_RESOLUTION
-from src.models.hex_models import HexCell, UserHexLocation, HexLandmark
+from src.hex_models import HexCell, UserHexLocation, HexLandmark
 
 
 class TestHexagonalLocationService:
@@ -26,7 +29,7 @@ class TestHexagonalLocationService:
         return {
             'lat': 40.7589,
             'lng': -73.9851,
-            'expected_h3': h3.geo_to_h3(40.7589, -73.9851, DEFAULT_RESOLUTION)
+            'expected_h3': h3.latlng_to_cell(40.7589, -73.9851, DEFAULT_RESOLUTION)
         }
     
     def test_get_hex_for_location(self, hex_service, sample_coordinates):
@@ -38,7 +41,7 @@ class TestHexagonalLocationService:
         
         assert h3_index == sample_coordinates['expected_h3']
         assert len(h3_index) == 15  # H3 index length
-        assert h3.h3_is_valid(h3_index)
+        assert h3.is_valid_cell(h3_index)
     
     def test_get_hex_for_location_custom_resolution(self, hex_service, sample_coordinates):
         """Test H3 conversion with custom resolution"""
@@ -49,8 +52,8 @@ class TestHexagonalLocationService:
                 resolution
             )
             
-            assert h3.h3_get_resolution(h3_index) == resolution
-            assert h3.h3_is_valid(h3_index)
+            assert h3.get_resolution(h3_index) == resolution
+            assert h3.is_valid_cell(h3_index)
     
     def test_get_or_create_hex_cell_existing(self, hex_service, mock_db, sample_coordinates):
         """Test getting existing hex cell"""
@@ -86,10 +89,9 @@ class TestHexagonalLocationService:
                 )
         
         # Verify new hex cell was created
-        assert result.h3_index == sample_coordinates['expected_h3']
+        assert result.h3_index == h3.str_to_int(sample_coordinates['expected_h3'])
         assert result.resolution == DEFAULT_RESOLUTION
-        assert result.center_lat == sample_coordinates['lat']
-        assert result.center_lng == sample_coordinates['lng']
+        assert (result.center_lat, result.center_lng) == h3.cell_to_latlng(sample_coordinates['expected_h3'])
         assert result.display_name == "Test Area"
         
         mock_db.add.assert_called_once()
@@ -109,9 +111,8 @@ class TestHexagonalLocationService:
         
         with patch.object(hex_service, 'get_or_create_hex_cell', return_value=hex_cell):
             with patch.object(hex_service, '_build_join_response', return_value={"test": "response"}):
-                # Mock no existing user location
-                mock_db.query.return_value.filter_by.return_value.first.return_value = None
-                mock_db.query.return_value.filter_by.return_value.count.return_value = 0
+                # Upsert inserts a fresh row, then the increment returns the new count
+                mock_db.execute.return_value.scalar_one.side_effect = [True, 1]
                 
                 result = hex_service.join_hex_chat(
                     "user123",
@@ -119,21 +120,21 @@ class TestHexagonalLocationService:
                     sample_coordinates['lng']
                 )
         
-        # Verify user location was created
-        mock_db.add.assert_called()
-        mock_db.commit.assert_called()
+        # Verify membership upsert and atomic increment, without recounting members
+        assert mock_db.execute.call_count == 2
+        increment = str(mock_db.execute.call_args_list[1][0][0].compile(dialect=postgresql.dialect()))
+        assert "active_users=(coalesce(hex_cells.active_users" in increment
+        assert "updated_at=" in increment
+        assert "RETURNING hex_cells.active_users" in increment
+        mock_db.query.assert_not_called()
+        mock_db.commit.assert_called_once()
         assert hex_cell.active_users == 1
         assert result == {"test": "response"}
     
     def test_join_hex_chat_existing_user(self, hex_service, mock_db, sample_coordinates):
         """Test existing user rejoining hex chat"""
-        # Mock existing user location
-        existing_user_location = UserHexLocation(
-            user_id="user123",
-            h3_index=sample_coordinates['expected_h3'],
-            joined_at=datetime.utcnow() - timedelta(hours=1)
-        )
-        mock_db.query.return_value.filter_by.return_value.first.return_value = existing_user_location
+        # Upsert hits the existing membership row
+        mock_db.execute.return_value.scalar_one.return_value = False
         
         hex_cell = HexCell(
             h3_index=sample_coordinates['expected_h3'],
@@ -151,51 +152,110 @@ class TestHexagonalLocationService:
                     sample_coordinates['lng']
                 )
         
-        # Verify last_seen was updated
-        assert existing_user_location.last_seen is not None
+        # Verify only last_active was refreshed
+        mock_db.execute.assert_called_once()
+        upsert = str(mock_db.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (user_id, h3_index) DO UPDATE SET last_active" in upsert
         assert hex_cell.active_users == 5  # Should not increment
-        mock_db.commit.assert_called()
+        mock_db.commit.assert_called_once()
+    
+    def test_join_hex_chat_redis_presence(self, mock_db, sample_coordinates):
+        """Test the count comes from Redis while membership is still upserted"""
+        redis = Mock()
+        redis.pipeline.return_value.execute.return_value = [1, 0, True, 3]
+        hex_service = HexagonalLocationService(mock_db, redis)
+        
+        hex_cell = HexCell(
+            h3_index=h3.str_to_int(sample_coordinates['expected_h3']),
+            resolution=DEFAULT_RESOLUTION,
+            center_lat=sample_coordinates['lat'],
+            center_lng=sample_coordinates['lng'],
+            active_users=0
+        )
+        
+        with patch.object(hex_service, 'get_or_create_hex_cell', return_value=hex_cell):
+            with patch.object(hex_service, '_build_join_response', return_value={"test": "response"}):
+                # Fresh membership row, then the database count is incremented
+                mock_db.execute.return_value.scalar_one.side_effect = [True, 1]
+                
+                hex_service.join_hex_chat(
+                    "user123",
+                    sample_coordinates['lat'],
+                    sample_coordinates['lng']
+                )
+        
+        pipe = redis.pipeline.return_value
+        pipe.zadd.assert_called_once()
+        assert pipe.zadd.call_args[0][0] == f"hex:{sample_coordinates['expected_h3']}:users"
+        
+        # last_active and active_users are still maintained in the database
+        assert mock_db.execute.call_count == 2
+        upsert = str(mock_db.execute.call_args_list[0][0][0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (user_id, h3_index) DO UPDATE SET last_active" in upsert
+        mock_db.commit.assert_called_once()
+        
+        # but the reported count is Redis' live presence
+        assert hex_cell.active_users == 3
+    
+    def test_join_hex_chat_redis_unavailable(self, mock_db, sample_coordinates):
+        """Test a Redis failure falls back to the database count"""
+        redis = Mock()
+        redis.pipeline.return_value.execute.side_effect = RedisError("down")
+        hex_service = HexagonalLocationService(mock_db, redis)
+        
+        hex_cell = HexCell(
+            h3_index=h3.str_to_int(sample_coordinates['expected_h3']),
+            resolution=DEFAULT_RESOLUTION,
+            center_lat=sample_coordinates['lat'],
+            center_lng=sample_coordinates['lng'],
+            active_users=4
+        )
+        
+        with patch.object(hex_service, 'get_or_create_hex_cell', return_value=hex_cell):
+            with patch.object(hex_service, '_build_join_response', return_value={"test": "response"}):
+                mock_db.execute.return_value.scalar_one.side_effect = [True, 5]
+                
+                result = hex_service.join_hex_chat(
+                    "user123",
+                    sample_coordinates['lat'],
+                    sample_coordinates['lng']
+                )
+        
+        mock_db.commit.assert_called_once()
+        assert hex_cell.active_users == 5
+        assert result == {"test": "response"}
     
     def test_get_active_neighbors(self, hex_service, mock_db, sample_coordinates):
         """Test getting active neighboring hex cells"""
         h3_index = sample_coordinates['expected_h3']
+        ring = sorted(h3.grid_ring(h3_index, 1), key=lambda n: h3.cell_to_latlng(n)[0])
+        north, south = ring[-1], ring[0]
         
         # Mock neighbor hex cells
         neighbor_hexes = [
             HexCell(
-                h3_index="neighbor1",
-                resolution=DEFAULT_RESOLUTION,
-                center_lat=40.7600,
-                center_lng=-73.9860,
-                display_name="North Neighbor",
-                active_users=10
-            ),
-            HexCell(
-                h3_index="neighbor2",
+                h3_index=h3.str_to_int(cell),
                 resolution=DEFAULT_RESOLUTION,
-                center_lat=40.7580,
-                center_lng=-73.9840,
-                display_name="South Neighbor",
-                active_users=5
+                center_lat=h3.cell_to_latlng(cell)[0],
+                center_lng=h3.cell_to_latlng(cell)[1],
+                display_name=name,
+                active_users=users
             )
+            for cell, name, users in ((south, "South Neighbor", 5), (north, "North Neighbor", 10))
         ]
         
         mock_db.query.return_value.filter.return_value.all.return_value = neighbor_hexes
         
-        with patch('h3.k_ring', return_value={"neighbor1", "neighbor2", h3_index}):
-            with patch('h3.h3_to_geo', side_effect=[
-                (40.7589, -73.9851),  # center
-                (40.7600, -73.9860),  # neighbor1
-                (40.7580, -73.9840)   # neighbor2
-            ]):
-                with patch('h3.point_dist', side_effect=[0.5, 0.8]):
-                    neighbors = hex_service.get_active_neighbors(h3_index)
+        neighbors = hex_service.get_active_neighbors(h3_index)
         
         assert len(neighbors) == 2
-        assert neighbors[0].h3_index == "neighbor1"
-        assert neighbors[0].name == "North Neighbor"
-        assert neighbors[0].active_users == 10
-        assert neighbors[0].distance_km == 0.5
+        assert {n.h3_index for n in neighbors} == {north, south}
+        assert {n.direction for n in neighbors} <= {"north", "northeast", "northwest", "south", "southeast", "southwest"}
+        by_name = {n.name: n for n in neighbors}
+        assert by_name["North Neighbor"].active_users == 10
+        assert by_name["North Neighbor"].distance_km == pytest.approx(
+            h3.great_circle_distance(h3.cell_to_latlng(h3_index), h3.cell_to_latlng(north)), abs=0.05
+        )
         
         # Should be sorted by distance
         assert neighbors[0].distance_km <= neighbors[1].distance_km
@@ -204,54 +264,26 @@ class TestHexagonalLocationService:
         """Test getting hex boundary coordinates"""
         h3_index = sample_coordinates['expected_h3']
         
-        # Mock h3 boundary
-        mock_boundary = [
-            (40.7595, -73.9845),
-            (40.7590, -73.9840),
-            (40.7585, -73.9845),
-            (40.7585, -73.9857),
-            (40.7590, -73.9862),
-            (40.7595, -73.9857)
-        ]
-        
-        with patch('h3.h3_to_geo_boundary', return_value=mock_boundary):
-            boundary = hex_service.get_hex_boundary(h3_index)
+        boundary = hex_service.get_hex_boundary(h3_index)
         
         assert len(boundary) == 6  # Hexagon has 6 vertices
-        assert boundary[0] == [40.7595, -73.9845]
+        assert boundary == [list(point) for point in h3.cell_to_boundary(h3_index)]
         assert all(len(point) == 2 for point in boundary)
     
     def test_cleanup_inactive_users(self, hex_service, mock_db):
-        """Test cleaning up inactive users"""
-        cutoff_time = datetime.utcnow() - timedelta(minutes=30)
-        
-        # Mock inactive users
-        inactive_users = [
-            UserHexLocation(user_id="user1", h3_index="hex1", last_seen=cutoff_time - timedelta(minutes=5)),
-            UserHexLocation(user_id="user2", h3_index="hex1", last_seen=cutoff_time - timedelta(minutes=10)),
-            UserHexLocation(user_id="user3", h3_index="hex2", last_seen=cutoff_time - timedelta(minutes=15))
-        ]
-        
-        # Mock hex cells
-        hex_cells = [
-            HexCell(h3_index="hex1", active_users=5),
-            HexCell(h3_index="hex2", active_users=3)
-        ]
-        
-        mock_db.query.return_value.filter.return_value.all.return_value = inactive_users
-        mock_db.query.return_value.filter_by.side_effect = [
-            Mock(first=Mock(return_value=hex_cells[0])),
-            Mock(first=Mock(return_value=hex_cells[1]))
-        ]
-        
+        """Test cleaning up inactive users in a single statement"""
         hex_service.cleanup_inactive_users(timeout_minutes=30)
         
-        # Verify inactive users were deleted
-        mock_db.query.return_value.filter.return_value.delete.assert_called_once()
-        
-        # Verify hex cell user counts were updated
-        assert hex_cells[0].active_users == 3  # 5 - 2 inactive users
-        assert hex_cells[1].active_users == 2  # 3 - 1 inactive user
+        # Deletes and count updates happen server-side in one round trip
+        mock_db.execute.assert_called_once()
+        sql = str(mock_db.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+        assert "WITH deleted AS" in sql
+        assert "DELETE FROM user_hex_locations" in sql
+        assert "user_hex_locations.last_active <" in sql
+        assert "RETURNING user_hex_locations.h3_index" in sql
+        assert "UPDATE hex_cells SET active_users=greatest(" in sql
+        assert "FROM removed WHERE hex_cells.h3_index = removed.h3_index" in sql
+        mock_db.query.assert_not_called()
         
         mock_db.commit.assert_called_once()
     
@@ -272,13 +304,12 @@ class TestHexagonalLocationService:
     
     def test_generate_hex_name_no_landmarks(self, hex_service, mock_db):
         """Test generating hex name without landmarks"""
-        h3_index = "test_hex"
+        h3_index = h3_int.latlng_to_cell(40.7589, -73.9851, 8)
         
         # Mock no landmarks
         mock_db.query.return_value.filter_by.return_value.all.return_value = []
         
-        with patch('h3.h3_get_resolution', return_value=8):
-            name = hex_service._generate_hex_name(h3_index, 40.7589, -73.9851)
+        name = hex_service._generate_hex_name(h3_index, 40.7589, -73.9851)
         
         assert name == "Neighborhood Chat"
     
@@ -299,11 +330,19 @@ class TestHexagonalLocationService:
         # West
         direction = hex_service._get_direction((40.7589, -73.9851), (40.7589, -73.9860))
         assert direction == "west"
-    
-    def test_build_join_response(self, hex_service):
+
+        # Northeast
+        direction = hex_service._get_direction((40.7589, -73.9851), (40.7600, -73.9840))
+        assert direction == "northeast"
+
+        # Southwest
+        direction = hex_service._get_direction((40.7589, -73.9851), (40.7578, -73.9862))
+        assert direction == "southwest"
+
+    def test_build_join_response(self, hex_service, sample_coordinates):
         """Test building join response"""
         hex_cell = HexCell(
-            h3_index="test_hex",
+            h3_index=h3.str_to_int(sample_coordinates['expected_h3']),
             resolution=8,
             center_lat=40.7589,
             center_lng=-73.9851,
@@ -312,16 +351,16 @@ class TestHexagonalLocationService:
             active_users=5
         )
         
-        with patch.object(hex_service, 'get_hex_boundary', return_value=[[40.759, -73.985]]):
-            with patch.object(hex_service, 'get_active_neighbors', return_value=[]):
-                response = hex_service._build_join_response(hex_cell, 40.7589, -73.9851)
+        with patch.object(hex_service, '_active_neighbors', return_value=[]):
+            response = hex_service._build_join_response(hex_cell, 40.7589, -73.9851)
         
-        assert response['hex_cell']['h3_index'] == "test_hex"
-        assert response['hex_cell']['resolution'] == 8
-        assert response['hex_cell']['center']['lat'] == 40.7589
-        assert response['hex_cell']['center']['lng'] == -73.9851
-        assert response['hex_cell']['display_name'] == "Test Area"
-        assert response['hex_cell']['active_users'] == 5
+        assert response['hex_cell'].h3_index == sample_coordinates['expected_h3']
+        assert response['hex_cell'].resolution == 8
+        assert response['hex_cell'].center['lat'] == 40.7589
+        assert response['hex_cell'].center['lng'] == -73.9851
+        assert response['hex_cell'].display_name == "Test Area"
+        assert response['hex_cell'].active_users == 5
+        assert len(response['hex_cell'].boundary) == 6
         assert response['neighbors'] == []
         assert response['your_position'] == {"lat": 40.7589, "lng": -73.9851}
 
@@ -330,7 +369,7 @@ class TestHexagonalLocationService:
 def sample_hex_data():
     """Sample hex data for testing"""
     return {
-        'h3_index': '882a1072cffffff',
+        'h3_index': h3.str_to_int('882a1072cffffff'),
         'resolution': 8,
         'center_lat': 40.7589,
         'center_lng': -73.9851,
@@ -349,7 +388,7 @@ class TestHexModels:
         assert hex_cell.center_lat == sample_hex_data['center_lat']
         assert hex_cell.center_lng == sample_hex_data['center_lng']
         assert hex_cell.display_name == sample_hex_data['display_name']
-        assert hex_cell.active_users == 0  # Default value
+        assert HexCell.__table__.c.active_users.default.arg == 0  # Default on insert
     
     def test_user_hex_location_creation(self, sample_hex_data):
         """Test creating UserHexLocation model"""
@@ -360,24 +399,20 @@ class TestHexModels:
         
         assert user_location.user_id == "user123"
         assert user_location.h3_index == sample_hex_data['h3_index']
-        assert user_location.joined_at is not None
-        assert user_location.last_seen is not None
+        assert UserHexLocation.__table__.c.joined_at.default is not None
+        assert UserHexLocation.__table__.c.last_active.default is not None
     
     def test_hex_landmark_creation(self, sample_hex_data):
         """Test creating HexLandmark model"""
         landmark = HexLandmark(
             h3_index=sample_hex_data['h3_index'],
             name="Central Park",
-            category="park",
-            lat=40.7589,
-            lng=-73.9851
+            category="park"
         )
         
         assert landmark.h3_index == sample_hex_data['h3_index']
         assert landmark.name == "Central Park"
         assert landmark.category == "park"
-        assert landmark.lat == 40.7589
-        assert landmark.lng == -73.9851
 
 
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.middleware import ClientIPMiddleware, RateLimitMiddleware
+
+
+async def noop_app(scope, receive, send):
+    pass
+
+
+def resolve(middleware, peer, forwarded_for=None):
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+    scope = {"type": "http", "client": (peer, 12345), "headers": headers}
+    asyncio.run(middleware(scope, None, None))
+    return scope["state"]["client_ip"]
+
+
+class TestClientIPMiddleware:
+
+    def test_ignores_forwarded_for_from_untrusted_peer(self):
+        """Test a client cannot choose its own address with X-Forwarded-For"""
+        middleware = ClientIPMiddleware(noop_app, trusted_proxies=())
+
+        assert resolve(middleware, "203.0.113.7", "198.51.100.1") == "203.0.113.7"
+
+    def test_uses_forwarded_for_from_trusted_proxy(self):
+        """Test the rightmost untrusted hop is used behind trusted proxies"""
+        middleware = ClientIPMiddleware(noop_app, trusted_proxies=("10.0.0.0/8",))
+
+        # A spoofed leftmost hop is skipped in favour of what the proxy appended
+        assert resolve(middleware, "10.0.0.5", "6.6.6.6, 198.51.100.1") == "198.51.100.1"
+        assert resolve(middleware, "10.0.0.5", "198.51.100.1, 10.0.0.7") == "198.51.100.1"
+        assert resolve(middleware, "10.0.0.5") == "10.0.0.5"
+
+    def test_missing_client(self):
+        """Test requests without a socket peer resolve to unknown"""
+        middleware = ClientIPMiddleware(noop_app, trusted_proxies=())
+        scope = {"type": "http", "client": None, "headers": []}
+
+        asyncio.run(middleware(scope, None, None))
+
+        assert scope["state"]["client_ip"] == "unknown"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
+
+
+class TestRateLimitMiddleware:
+
+    def test_pipeline_fallback_avoids_expire_nx(self):
+        """Test the non-script path sets the window TTL without EXPIRE ... NX"""
+        middleware = RateLimitMiddleware(noop_app, requests_per_minute=2)
+        middleware.use_script = False
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(side_effect=[[True, 1], [None, 3]])
+        middleware.redis = MagicMock()
+        middleware.redis.pipeline.return_value.__aenter__.return_value = pipe
+
+        assert asyncio.run(middleware._hit("rate_limit:203.0.113.7")) == 1
+        assert asyncio.run(middleware._hit("rate_limit:203.0.113.7")) == -1
+
+        pipe.set.assert_called_with("rate_limit:203.0.113.7", 0, ex=60, nx=True)
+        pipe.incr.assert_called_with("rate_limit:203.0.113.7")
+        pipe.expire.assert_not_called()
@@ -0,0 +1,331 @@
+import pytest
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import h3
+import numpy as np
+from datetime import datetime
+
+from src.models import LocationResponse, Coordinates, AddressComponents
+from shapely.geometry import Point, Polygon
+
+from src.services.spatial_service import (
+    SpatialAnalysisService, polygon_h3_cover, h3_cells_to_parent, h3_cell_resolutions,
+    haversine_nearest, hull_area, FAST_MARKER_MIN_LOCATIONS
+)
+
+
+NYC_POINTS = [
+    ('empire_state', 40.7484, -73.9857),
+    ('central_park', 40.7829, -73.9654),
+    ('brooklyn_bridge', 40.7061, -73.9969),
+    ('times_square', 40.7580, -73.9855),
+    ('statue_liberty', 40.6892, -74.0445),
+    ('wall_street', 40.7074, -74.0113),
+]
+
+
+def make_location(place_id: str, lat: float, lon: float) -> LocationResponse:
+    return LocationResponse(
+        id=uuid.uuid4(),
+        place_id=place_id,
+        address_string=f"{place_id}, New York, NY",
+        normalized_address=place_id,
+        coordinates=Coordinates(latitude=lat, longitude=lon),
+        components=AddressComponents(city="New York", state="NY", country="US"),
+        created_at=datetime.now()
+    )
+
+
+class TestSpatialAnalysisService:
+
+    @pytest.fixture
+    def spatial_service(self):
+        """Create spatial analysis service"""
+        return SpatialAnalysisService()
+
+    @pytest.fixture
+    def locations(self):
+        """Sample NYC locations"""
+        return [make_location(*point) for point in NYC_POINTS]
+
+    def test_find_nearest_neighbors(self, spatial_service, locations):
+        """Test nearest neighbors are returned closest first with meter distances"""
+        target = Coordinates(latitude=40.7580, longitude=-73.9855)  # Times Square
+
+        nearest = spatial_service.find_nearest_neighbors(target, locations, k=3)
+
+        assert [loc.place_id for loc, _ in nearest] == [
+            'times_square', 'empire_state', 'central_park'
+        ]
+        assert nearest[0][1] == pytest.approx(0, abs=1)
+        # Times Square to Empire State Building is roughly 1.07km
+        assert nearest[1][1] == pytest.approx(1070, rel=0.05)
+        assert all(a[1] <= b[1] for a, b in zip(nearest, nearest[1:]))
+
+    def test_find_nearest_neighbors_k_larger_than_locations(self, spatial_service, locations):
+        """Test asking for more neighbors than available returns all locations"""
+        target = Coordinates(latitude=40.7580, longitude=-73.9855)
+
+        nearest = spatial_service.find_nearest_neighbors(target, locations[:2], k=5)
+
+        assert len(nearest) == 2
+
+    def test_find_nearest_neighbors_empty(self, spatial_service):
+        """Test nearest neighbors of an empty location set"""
+        target = Coordinates(latitude=40.7580, longitude=-73.9855)
+
+        assert spatial_service.find_nearest_neighbors(target, [], k=3) == []
+
+    def test_nearest_index_rebuilt_when_locations_change(self, spatial_service, locations):
+        """Test the cached index is reused for the same set and rebuilt for a new one"""
+        tree = spatial_service._get_nearest_index(locations)
+
+        assert spatial_service._get_nearest_index(list(locations)) is tree
+        assert spatial_service._get_nearest_index(locations[:3]) is not tree
+        # Earlier sets stay cached alongside newer ones
+        assert spatial_service._get_nearest_index(locations) is tree
+
+    def test_find_nearest_neighbors_with_cache_key(self, spatial_service, locations):
+        """Test a caller-supplied cache key reuses the index without rebuilding"""
+        target = Coordinates(latitude=40.7580, longitude=-73.9855)
+
+        first = spatial_service.find_nearest_neighbors(target, locations, k=2, cache_key='nyc:v1')
+        tree = spatial_service._get_nearest_index(locations, cache_key='nyc:v1')
+        second = spatial_service.find_nearest_neighbors(target, locations, k=2, cache_key='nyc:v1')
+
+        assert spatial_service._get_nearest_index(locations, cache_key='nyc:v1') is tree
+        assert [loc.place_id for loc, _ in first] == [loc.place_id for loc, _ in second]
+
+    def test_nearest_index_shared_across_threads(self, spatial_service, locations):
+        """Test concurrent lookups for one key all end up with the same cached tree"""
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            trees = list(pool.map(
+                lambda _: spatial_service._get_nearest_index(locations, cache_key='nyc:v1'), range(32)
+            ))
+
+        assert len({id(tree) for tree in trees}) == 1
+        assert spatial_service._get_nearest_index(locations, cache_key='nyc:v1') is trees[-1]
+        assert len(spatial_service._nn_indexes) == 1
+
+    def test_haversine_nearest_matches_ball_tree(self, spatial_service):
+        """Test the direct scan agrees with the BallTree used for large sets"""
+        rng = np.random.default_rng(0)
+        locations = [
+            make_location(f"p{i}", lat, lon)
+            for i, (lat, lon) in enumerate(zip(rng.uniform(40.6, 40.9, 200), rng.uniform(-74.1, -73.8, 200)))
+        ]
+        coords = spatial_service._coords_rad_f32(locations)
+        target = np.deg2rad(np.array([40.75, -73.98], dtype=np.float32))
+
+        distances, indices = haversine_nearest(coords, target, 10)
+        tree_distances, tree_indices = spatial_service._get_nearest_index(locations).query(
+            target.reshape(1, 2), k=10
+        )
+
+        assert indices.tolist() == tree_indices[0].tolist()
+        np.testing.assert_allclose(distances, tree_distances[0], rtol=1e-5)
+
+    def test_find_clusters(self, spatial_service, locations):
+        """Test DBSCAN groups nearby locations and reports geometry in meters"""
+        clusters = spatial_service.find_clusters(locations, eps_meters=1500, min_samples=2)
+
+        groups = sorted(
+            sorted(loc.place_id for loc in cluster.locations) for cluster in clusters
+        )
+        # Times Square/Empire State and Wall Street/Brooklyn Bridge are within 1.5km
+        assert groups == [
+            ['brooklyn_bridge', 'wall_street'],
+            ['empire_state', 'times_square'],
+        ]
+
+        midtown = next(c for c in clusters if len(c.locations) == 2 and
+                       c.locations[0].place_id in ('empire_state', 'times_square'))
+        assert midtown.centroid.latitude == pytest.approx(40.7532, abs=1e-3)
+        assert midtown.centroid.longitude == pytest.approx(-73.9856, abs=1e-3)
+        assert 500 < midtown.radius_meters < 1000
+
+    def test_build_clusters_from_database_labels(self, spatial_service, locations):
+        """Test ST_ClusterDBSCAN style labels (None for noise) build the same clusters"""
+        clusters = spatial_service.find_clusters(locations, eps_meters=1500, min_samples=2)
+        labels = [None] * len(locations)
+        for cluster in clusters:
+            for loc in cluster.locations:
+                labels[locations.index(loc)] = cluster.cluster_id
+
+        rebuilt = spatial_service.build_clusters(locations, labels)
+
+        assert [(c.cluster_id, c.radius_meters) for c in rebuilt] == \
+            [(c.cluster_id, c.radius_meters) for c in clusters]
+
+    def test_find_clusters_too_few_locations(self, spatial_service, locations):
+        """Test clustering needs at least min_samples locations"""
+        assert spatial_service.find_clusters(locations[:2], min_samples=3) == []
+
+    def test_calculate_spatial_statistics(self, spatial_service, locations):
+        """Test mean nearest neighbor distance excludes each point itself"""
+        stats = spatial_service.calculate_spatial_statistics(locations)
+
+        assert stats['total_locations'] == len(locations)
+        # Great-circle meters; every NYC point has a neighbor within a few km
+        assert 0 < stats['mean_nearest_neighbor_distance'] < 5000
+        assert stats['mean_nearest_neighbor_distance'] == pytest.approx(np.mean([
+            min(
+                h3.great_circle_distance(
+                    (a.coordinates.latitude, a.coordinates.longitude),
+                    (b.coordinates.latitude, b.coordinates.longitude),
+                    unit='m'
+                )
+                for b in locations if b is not a
+            )
+            for a in locations
+        ]), rel=1e-3)
+        assert spatial_service.calculate_spatial_statistics(locations[:1])[
+            'mean_nearest_neighbor_distance'] == 0
+
+    def test_calculate_service_area(self, spatial_service, locations):
+        """Test the service area covers every location and coarser buffers shrink it"""
+        area, area_sqkm = spatial_service.calculate_service_area(locations, buffer_meters=1000)
+        _, coarse_sqkm = spatial_service.calculate_service_area(
+            locations, buffer_meters=1000, quad_segs=2
+        )
+
+        assert all(
+            area.contains(Point(loc.coordinates.longitude, loc.coordinates.latitude))
+            for loc in locations
+        )
+        # Six 1km buffers in Web Mercator meters, some of them overlapping
+        assert 10 < area_sqkm < 6 * np.pi
+        assert coarse_sqkm < area_sqkm
+        assert spatial_service.calculate_service_area([]) == (None, 0.0)
+
+    def test_hull_area(self):
+        """Test hull area of a square and of degenerate point sets"""
+        square = np.array([[0, 0], [2, 0], [2, 2], [0, 2], [1, 1]], dtype=float)
+
+        assert hull_area(square) == pytest.approx(4.0)
+        assert hull_area(square[:2]) == 0.0
+        assert hull_area(np.array([[0, 0], [1, 1], [2, 2]], dtype=float)) == 0.0
+
+    def test_calculate_h3_indices_bulk(self, spatial_service, locations):
+        """Test bulk H3 indexing matches the per-point string API"""
+        lats = [loc.coordinates.latitude for loc in locations]
+        lons = [loc.coordinates.longitude for loc in locations]
+
+        cells = spatial_service.calculate_h3_indices_bulk(lats, lons, resolution=9)
+
+        assert cells.dtype == np.uint64
+        assert [h3.int_to_str(c) for c in cells.tolist()] == [
+            spatial_service.calculate_h3_indices(lat, lon, 9) for lat, lon in zip(lats, lons)
+        ]
+
+    def test_create_h3_heatmap(self, spatial_service, locations):
+        """Test heatmap keys are H3 strings normalized to the densest hex"""
+        density = spatial_service.create_h3_heatmap(locations, resolution=5)
+
+        assert all(h3.is_valid_cell(hex_id) for hex_id in density)
+        assert max(density.values()) == 1.0
+
+    def test_create_h3_heatmap_reuses_stored_index(self, spatial_service, locations):
+        """Test stored finer H3 indices are rolled up to the heatmap resolution"""
+        for loc in locations:
+            loc.h3_index = spatial_service.calculate_h3_indices(
+                loc.coordinates.latitude, loc.coordinates.longitude, 9
+            )
+
+        assert spatial_service.create_h3_heatmap(locations, resolution=7) == \
+            spatial_service.create_h3_heatmap(
+                [loc.model_copy(update={'h3_index': None}) for loc in locations], resolution=7
+            )
+
+    def test_create_h3_heatmap_precomputed_cells(self, spatial_service, locations):
+        """Test caller-supplied cells are rolled up and unknown ones computed"""
+        cells = spatial_service.calculate_h3_indices_bulk(
+            [loc.coordinates.latitude for loc in locations],
+            [loc.coordinates.longitude for loc in locations],
+            resolution=9
+        )
+        cells[0] = 0
+
+        assert spatial_service.create_h3_heatmap(locations, resolution=7, cells=cells) == \
+            spatial_service.create_h3_heatmap(locations, resolution=7)
+
+    def test_create_h3_heatmap_compact(self, spatial_service):
+        """Test a full family of sparse hexes collapses into its parent"""
+        parent = h3.latlng_to_cell(40.75, -73.98, 6)
+        children = h3.cell_to_children(parent, 7)
+        locations = [make_location(f"c{i}", *h3.cell_to_latlng(cell)) for i, cell in enumerate(children)]
+        # A second location in one hex of a separate, incomplete family
+        dense_cell = h3.latlng_to_cell(40.60, -74.20, 7)
+        locations += [make_location(f"d{i}", *h3.cell_to_latlng(dense_cell)) for i in range(2)]
+
+        density = spatial_service.create_h3_heatmap(locations, resolution=7, compact_below=1)
+
+        assert density == {parent: 0.5, dense_cell: 1.0}
+        assert len(spatial_service.create_h3_heatmap(locations, resolution=7)) == len(children) + 1
+
+    def test_find_locations_in_polygon(self, spatial_service, locations):
+        """Test only locations strictly inside the polygon are returned"""
+        lower_manhattan = Polygon([(-74.02, 40.70), (-73.99, 40.70), (-73.99, 40.72), (-74.02, 40.72)])
+
+        inside = spatial_service.find_locations_in_polygon(locations, lower_manhattan)
+
+        assert [loc.place_id for loc in inside] == ['brooklyn_bridge', 'wall_street']
+        assert spatial_service.find_locations_in_polygon([], lower_manhattan) == []
+
+    def test_find_locations_in_polygon_with_cache_key(self, spatial_service, locations):
+        """Test the cached STRtree path matches the direct scan and is reused"""
+        lower_manhattan = Polygon([(-74.02, 40.70), (-73.99, 40.70), (-73.99, 40.72), (-74.02, 40.72)])
+        midtown = Polygon([(-74.00, 40.74), (-73.97, 40.74), (-73.97, 40.77), (-74.00, 40.77)])
+
+        for polygon in (lower_manhattan, midtown):
+            assert spatial_service.find_locations_in_polygon(locations, polygon, cache_key='nyc:v1') == \
+                spatial_service.find_locations_in_polygon(locations, polygon)
+        assert len(spatial_service._point_indexes) == 1
+
+    def test_h3_cells_to_parent(self, spatial_service, locations):
+        """Test the vectorized parent lookup matches h3 for every coarser resolution"""
+        cells = spatial_service.calculate_h3_indices_bulk(
+            [loc.coordinates.latitude for loc in locations],
+            [loc.coordinates.longitude for loc in locations],
+            resolution=9
+        )
+
+        assert h3_cell_resolutions(cells).tolist() == [9] * len(locations)
+        for resolution in range(10):
+            assert h3_cells_to_parent(cells, resolution).tolist() == [
+                h3.str_to_int(h3.cell_to_parent(h3.int_to_str(c), resolution)) for c in cells.tolist()
+            ]
+
+    def test_create_folium_map_fast_markers(self, spatial_service):
+        """Test large location sets render markers client-side"""
+        locations = [
+            make_location(f"<p{i}>", 40.7 + i * 1e-4, -74.0) for i in range(FAST_MARKER_MIN_LOCATIONS)
+        ]
+
+        page = spatial_service.create_folium_map(locations)
+
+        # Marker rows are built by the Leaflet callback, not as individual markers
+        assert 'row[2]' in page
+        assert 'row[2]' not in spatial_service.create_folium_map(locations[:3])
+
+    def test_polygon_h3_cover(self):
+        """Test interior cells lie inside the polygon and edge cells straddle it"""
+        polygon = Polygon([(-74.0, 40.70), (-73.97, 40.70), (-73.97, 40.73), (-74.0, 40.73)])
+
+        interior, edge = polygon_h3_cover(polygon.wkb)
+
+        assert interior and edge
+        assert not interior & edge
+        for cell in interior:
+            assert polygon.contains(Polygon([(lng, lat) for lat, lng in h3.cell_to_boundary(h3.int_to_str(cell))]))
+        assert polygon_h3_cover(polygon.wkb) == (interior, edge)
+
+    def test_polygon_h3_cover_too_large(self):
+        """Test very large polygons skip the H3 prefilter"""
+        polygon = Polygon([(-80.0, 35.0), (-70.0, 35.0), (-70.0, 45.0), (-80.0, 45.0)])
+
+        assert polygon_h3_cover(polygon.wkb) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])